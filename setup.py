@@ -6,7 +6,7 @@ setup(
     url = 'https://github.com/andrewcooke/simple-date',
     requires = ['pytz', 'tzlocal'],
     install_requires = ['pytz', 'tzlocal'],
-    packages = ['simpledate'],
+    packages = ['simpledate', 'simpledate.benchmarks'],
     package_dir = {'': 'src'},
     version = '0.5.0',
     description = 'Simple dates (and times, and timezones).',
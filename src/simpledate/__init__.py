@@ -1,13 +1,21 @@
 
+from array import array
+from bisect import bisect_right
 from calendar import timegm
 import datetime as dt
+import sys
+from warnings import warn
 from itertools import islice
-from collections import OrderedDict
-from threading import local
+from collections import OrderedDict, namedtuple
+from weakref import WeakValueDictionary
+from threading import Lock
 from tzlocal import get_localzone
 from pytz import timezone, country_timezones, all_timezones, FixedOffset, utc, NonExistentTimeError, common_timezones, UTC
-from simpledate.fmt import strptime, reconstruct, strip, invert, auto_invert
-from simpledate.utils import DebugLog, MRUSortedIterable, OrderedSet, set_kargs_only, always_tuple
+from pytz.tzinfo import DstTzInfo, StaticTzInfo
+from simpledate.fmt import strptime, strptime_lazy, strptime_first, strptime_known, strptime_iso, _to_regexp_full, reconstruct, strip, invert, auto_invert
+from simpledate.utils import DebugLog, MRUSortedIterable, ShapeClassifier, shape, OrderedSet, set_kargs_only, always_tuple
+from simpledate.tzindex import TzIndex, zone_transitions, period, shared_index
+from simpledate.stats import active, ISO, EXPAND, DISTINCT, LOCALIZE
 
 
 # A wrapper around the datetime, pytz and tzlocal packages.
@@ -189,34 +197,39 @@ def is_int_or_none(value): return value is None or isinstance(value, int)
 def take(n, iterable): return islice(iterable, 0, n)
 
 
-def prefer(*countries, using=set(country_timezones.keys())):
+def prefer(*countries, using=None):
     '''
     Pull some countries to the front of the list.  When used with
     `unsafe=True` this can help select the expected timezone.
 
     :param countries: The countries to prefer (in order).
-    :param using: The full list of countries.
+    :param using: The full list of countries (`None` for all known to pytz).
     :return: All country codes, with the given ones first.
     '''
+    if using is None: using = set(country_timezones.keys())
     codes = OrderedSet(countries)
     codes.union(using)
     return codes
 
 
-def exclude(*countries, using=set(country_timezones.keys())):
+def exclude(*countries, using=None):
     '''
     Drop some countries from the list.
 
     :param countries: The countries to prefer (in order).
-    :param using: The full list of countries.
+    :param using: The full list of countries (`None` for all known to pytz).
     :return: All country codes, with the given ones first.
     '''
+    if using is None: using = set(country_timezones.keys())
     return OrderedSet(code for code in using if code not in countries)
 
 
 # Exceptions.
 
 
+CacheInfo = namedtuple('CacheInfo', 'hits misses maxsize currsize')
+
+
 class SimpleDateError(Exception):
 
     def __init__(self, template='', *args, **kargs):
@@ -312,22 +325,57 @@ class SingleInstantTzError(SimpleDateError):
 class SingleInstantTz(dt.tzinfo):
     '''
     A timezone valid only for one particular instant.
+
+    Instances are immutable and interned, so identical timezones (same
+    offset, name and validity) share a single instance.
     '''
 
-    __slots__ = ('__tz', '__datetime')
+    __slots__ = ('__tz', '__start', '__end', '__weakref__')
 
-    def __init__(self, tzinfo, datetime, is_dst):
+    __interned = WeakValueDictionary()  # (class, offset, name, start, end) -> instance
+
+    def __new__(cls, tzinfo, datetime, is_dst, others=()):
         '''
-        :param offset: The offset for the timezone (timedelta instance).
-        :param name: The name of the timezone.
+        :param tzinfo: The timezone that gives the offset and name.
         :param datetime: The instant for which we know this is valid.
+        :param is_dst: Used to resolve ambiguities when finding the name.
+        :param others: Other timezones that must not change offset while
+                       this is valid (see `IntervalTz`).
         :return: A tzinfo that only works for the given instant.
         '''
         offset = tzinfo_utcoffset(tzinfo, datetime)
         name = tzinfo_tzname(tzinfo, datetime, is_dst)
-        self.__tz = dt.timezone(offset, name)
+        tz = dt.timezone(offset, name)
         # store as utc so that we can easily compare with other values.
-        self.__datetime = tzinfo_astimezone(utc, tzinfo_astimezone(self.__tz, datetime))
+        instant = tzinfo_astimezone(utc, tzinfo_astimezone(tz, datetime))
+        start, end = cls._interval(tzinfo, instant, others)
+        key = (cls, offset, name, start, end)
+        self = cls.__interned.get(key)
+        if self is None:
+            self = super().__new__(cls)
+            self.__tz, self.__start, self.__end = tz, start, end
+            # another thread may have been first.
+            self = cls.__interned.setdefault(key, self)
+        return self
+
+    @classmethod
+    def _interval(cls, tzinfo, instant, others=()):
+        '''
+        :param tzinfo: The timezone that gives the offset and name.
+        :param instant: The (UTC) instant for which we know this is valid.
+        :param others: Other timezones that must not change offset.
+        :return: The (UTC) start and (exclusive) end of the times for which
+                 the timezone is valid (`None` if unlimited).
+        '''
+        return instant, instant + dt.timedelta(microseconds=1)
+
+    @property
+    def start(self):
+        return self.__start
+
+    @property
+    def end(self):
+        return self.__end
 
     def __check(self, method, datetime):
         '''
@@ -339,18 +387,17 @@ class SingleInstantTz(dt.tzinfo):
         check = datetime
         if check.tzinfo is self:
             check = check.replace(tzinfo=self.__tz)
-        if check.tzinfo:
-            check = check.astimezone(utc)
-        if check.year == self.__datetime.year and \
-                check.month == self.__datetime.month and \
-                check.day == self.__datetime.day and \
-                check.hour == self.__datetime.hour and \
-                check.minute == self.__datetime.minute and \
-                check.second == self.__datetime.second and \
-                check.microsecond == self.__datetime.microsecond:
+        check = check.astimezone(utc) if check.tzinfo else check.replace(tzinfo=utc)
+        if (self.__start is None or self.__start <= check) and (self.__end is None or check < self.__end):
             return method(datetime)
         else:
-            raise SingleInstantTzError(self.__tz, self.__datetime, datetime)
+            raise SingleInstantTzError(self.__tz, self._describe(), datetime)
+
+    def _describe(self):
+        '''
+        :return: A description of when the timezone is valid.
+        '''
+        return self.__start
 
     # delegate the usual API after checking (or, in some cases related to
     # conversion, check afterwards).
@@ -372,7 +419,15 @@ class SingleInstantTz(dt.tzinfo):
         return str(self.__tz)
 
     def __repr__(self):
-        return '{0}({1!r}, {2!r}, {3!r})'.format(self.__class__.__name__, self.__tz.utcoffset(self.__datetime), str(self.__tz), self.__datetime)
+        return '{0}({1!r}, {2!r}, {3})'.format(self.__class__.__name__, self.__tz.utcoffset(None), str(self.__tz),
+                                               ', '.join(map(repr, self._limits())))
+
+    def _limits(self):
+        '''
+        :return: The values that define when the timezone is valid (for
+                 `repr()`).
+        '''
+        return self.__start,
 
     def localize(self, datetime, is_dst=False):
         datetime = self.__localize(datetime)
@@ -392,27 +447,129 @@ class SingleInstantTz(dt.tzinfo):
         return tzinfo_astimezone(self, datetime)
 
 
+class IntervalTz(SingleInstantTz):
+    '''
+    A timezone valid for the interval (between transitions) that contains
+    a particular instant in the timezone it was taken from and in any other
+    timezones given (eg the other candidates in a search, which could make
+    the result ambiguous if they changed offset).  So arithmetic (within the
+    interval) and conversions work without a new search.
+
+    If the transitions are not known this is valid only for the instant
+    (like `SingleInstantTz`).
+    '''
+
+    __slots__ = ()
+
+    __transitions = {}  # tzinfo -> array of transitions (seconds)
+
+    @classmethod
+    def _interval(cls, tzinfo, instant, others=()):
+        seconds, start, end = TzIndex.instant(instant), None, None
+        for zone in (tzinfo,) + tuple(others):
+            transitions = cls.__zone_transitions(zone)
+            if transitions is None:
+                return super()._interval(tzinfo, instant)
+            i = bisect_right(transitions, seconds)
+            if i and (start is None or transitions[i-1] > start):
+                start = transitions[i-1]
+            if i < len(transitions) and (end is None or transitions[i] < end):
+                end = transitions[i]
+        return (None if start is None else cls.__utc(start),
+                None if end is None else cls.__utc(end))
+
+    @classmethod
+    def __zone_transitions(cls, tzinfo):
+        '''
+        :param tzinfo: A timezone.
+        :return: The transitions (seconds, an array), or `None` if unknown.
+        '''
+        try:
+            return cls.__transitions[tzinfo]
+        except (KeyError, TypeError):  # unknown or unhashable
+            transitions = zone_transitions(tzinfo)
+            if transitions is None:
+                return None
+            transitions = array('q', transitions)
+            # pytz caches these, but other timezones may be created freely,
+            # so are not kept.
+            if isinstance(tzinfo, (DstTzInfo, StaticTzInfo)):
+                cls.__transitions[tzinfo] = transitions
+            return transitions
+
+    @staticmethod
+    def __utc(seconds):
+        return dt.datetime(1970, 1, 1, tzinfo=utc) + dt.timedelta(seconds=seconds)
+
+    def _describe(self):
+        return '{0} to {1}'.format(self.start or 'the beginning', self.end or 'the end')
+
+    def _limits(self):
+        return self.start, self.end
+
+
+# the number of zones returned by unsafe searches that are tried first.
+MAX_RECENT = 10
+
+
 class PyTzFactory(DebugLog):
     '''
     Generate timezones (mainly from strings, but other formats are supported
     in places, too).
 
-    IMPORTANT: Not thread safe.
+    An instance can be shared between threads.
     '''
 
-    def __init__(self, timezones=None, countries=None, debug=False):
+    def __init__(self, timezones=None, countries=None, cache_size=1000, debug=False, stats=None):
         '''
         :param timezones: The zones to search by default.
         :param countries: Countries to use by default (None implies all).
+        :param cache_size: The number of search results to cache (0 disables
+                           the cache).
         :param debug: If true, display debug messages to stdout.
+        :param stats: A `simpledate.stats.Stats` instance to record the
+                      stages of each search (`None` uses the global
+                      instance, if enabled).
         :return: A new instance of the factory.
         '''
-        if timezones is None:
-            timezones = common_timezones + [Z]
-        timezones = set.union(*[set(self.expand_tz(zone, debug=debug)) for zone in timezones])
+        self.__stats = stats
+        self.__cache_size = cache_size
+        self.__cache = OrderedDict()  # LRU order, oldest first
+        self.__lock = Lock()  # for changes to the cache (and statistics)
+        self.__transitions = {}  # search arguments -> transitions
+        self.__hits = self.__misses = 0
+        self.__recent = ()  # zones returned by unsafe searches, most recent first
+        self.__debug = debug
+        if timezones is None and not countries:
+            # the default zones are indexed by name (see load_index), the
+            # index is shared by all factories, and the zones are only
+            # created when a search needs them all.
+            self.__timezones, self.__sorted_zones = common_timezones + [Z], None
+            self.__index = shared_index(common_timezones, (Z,))
+        else:
+            timezones = self.__expand_all(common_timezones + [Z] if timezones is None else timezones, countries)
+            self.__sorted_zones = MRUSortedIterable(timezones)
+            # sort by name so that searches by abbreviation are repeatable.
+            self.__index = TzIndex(sorted(timezones, key=str))
+
+    def __expand_all(self, timezones, countries):
+        '''
+        :param timezones: The zones to search by default.
+        :param countries: Countries to use by default (None implies all).
+        :return: The set of timezones.
+        '''
+        timezones = set.union(*[set(self.expand_tz(zone, debug=self.__debug)) for zone in timezones])
         if countries:
-            timezones = timezones.intersection(self.expand_country(*countries, debug=debug))
-        self.__sorted_zones = MRUSortedIterable(timezones)
+            timezones = timezones.intersection(self.expand_country(*countries, debug=self.__debug))
+        return timezones
+
+    def __all_zones(self):
+        '''
+        :return: The zones to search by default (created on first use).
+        '''
+        if self.__sorted_zones is None:
+            self.__sorted_zones = MRUSortedIterable(self.__expand_all(self.__timezones, None))
+        return self.__sorted_zones
 
     def search(self, *timezones, datetime=None, is_dst=False, country=None, unsafe=False, debug=False):
         '''
@@ -421,7 +578,7 @@ class PyTzFactory(DebugLog):
         To get a timezone for a given date:
         >>> from datetime import datetime
         >>> PyTzFactory().search('EDT', datetime=datetime(2013,6,1))
-        SingleInstantTz(datetime.timedelta(-1, 72000), 'EDT', datetime.datetime(2013, 6, 1, 0, 0, tzinfo=<UTC>))
+        IntervalTz(datetime.timedelta(-1, 72000), 'EDT', datetime.datetime(2013, 3, 10, 7, 0, tzinfo=<UTC>), datetime.datetime(2013, 11, 3, 6, 0, tzinfo=<UTC>))
 
         To test whether GMT is a valid timezone in London in January:
         >>> PyTzFactory().search('Europe/London', 'GMT', datetime=datetime(2013,1,1))
@@ -441,7 +598,7 @@ class PyTzFactory(DebugLog):
 
         but can be resolve by, for example:
         >>> PyTzFactory().search('EST', country='US', datetime=datetime(2013,1,1))
-        SingleInstantTz(datetime.timedelta(-1, 68400), 'EST', datetime.datetime(2013, 1, 1, 0, 0, tzinfo=<UTC>))
+        IntervalTz(datetime.timedelta(-1, 68400), 'EST', datetime.datetime(2012, 11, 4, 6, 0, tzinfo=<UTC>), datetime.datetime(2013, 3, 10, 7, 0, tzinfo=<UTC>))
 
         or, since PyTZ defines this as an unlimited timezone (note that `datetime` is omitted):
         >>> PyTzFactory().search('EST')
@@ -464,9 +621,44 @@ class PyTzFactory(DebugLog):
         :return: A timezone consistent with the parameters given.
         '''
 
+        datetime = always_datetime(datetime)
+        key = self.__cache_key(timezones, datetime, is_dst, country, unsafe)
+        try:
+            result = self.__cache[key]
+        except KeyError:
+            # the search is not locked, so may be repeated by other threads
+            found, others = self.__resolve(*timezones, datetime=datetime, is_dst=is_dst, country=country, unsafe=unsafe, debug=debug)
+            # the interval contains the whole period of the cache key, so
+            # the wrapped timezone is cached too.
+            result = found if others is None else IntervalTz(found, datetime, is_dst, others)
+            with self.__lock:
+                self.__misses += 1
+                if key is not None:
+                    self.__cache[key] = result
+                    if len(self.__cache) > self.__cache_size:
+                        self.__cache.popitem(last=False)
+        else:
+            with self.__lock:
+                self.__hits += 1
+                if key in self.__cache:  # may have been dropped meanwhile
+                    self.__cache.move_to_end(key)
+            if debug: self._get_log(debug)('Cached result {0} for {1!r}', result, timezones)
+        return result
+
+    def __resolve(self, *timezones, datetime=None, is_dst=False, country=None, unsafe=False, debug=False):
+        '''
+        The work behind `search()`.
+
+        :return: A timezone and, if it must be wrapped as an `IntervalTz`
+                 (because it was chosen only by its offset at the given
+                 `datetime`), the other candidates (otherwise `None`).
+        '''
+
         log = self._get_log(debug)
+        stats = active(self.__stats)
+        start = stats.start() if stats else 0
         datetime = always_datetime(datetime)
-        log(PyTzFactoryError.format('Searching', timezones, datetime, is_dst, country, unsafe))
+        if log: log(PyTzFactoryError.format('Searching', timezones, datetime, is_dst, country, unsafe))
 
         # either start with the timezones by country or 'everything' (None).
         if country is None:
@@ -481,7 +673,7 @@ class PyTzFactory(DebugLog):
 
         # if we never filtered anything, we have everything.
         if known is None:
-            known = set(self.__sorted_zones)
+            known = set(self.__all_zones())
 
         # in the unsafe case we don't force evaluation of the complete
         # generator.  instead, we pull the first value and return as a
@@ -489,36 +681,148 @@ class PyTzFactory(DebugLog):
         if unsafe:
             try:
                 found = next(known)
-                log('Found (unsafe) {0}', found)
-                return SingleInstantTz(found, datetime, is_dst)
+                if log: log('Found (unsafe) {0}', found)
+                self.__promote(found)
+                return found, ()
             except StopIteration:
                 raise NoTimezone(timezones, datetime, is_dst, country, unsafe)
+            finally:
+                if stats: stats.stop(EXPAND, start)
 
         # otherwise, we do expand everything (which is slower).  we can then
         # check whether we have a unique value, or whether the repeated values
         # all have the same offset.
         else:
             known = list(known)
+            if stats: stats.stop(EXPAND, start)
             if not known:
                 raise NoTimezone(timezones, datetime, is_dst, country, unsafe)
             elif len(known) == 1:
                 found = known[0]
-                log('Found {0}', found)
-                return found
+                if log: log('Found {0}', found)
+                return found, None
             else:
+                start = stats.start() if stats else 0
                 distinct = list(self.distinct(known, datetime=datetime, debug=debug))
-                log('Have {0} distinct timezone(s)', len(distinct))
+                if stats: stats.stop(DISTINCT, start)
+                if log: log('Have {0} distinct timezone(s)', len(distinct))
                 if len(distinct) == 1:
                     found = next(iter(distinct))
-                    log('Found {0}', found)
+                    if log: log('Found {0}', found)
                     # special case UTC here, because it's not a temporal timezone
-                    if found is UTC:
-                        return found
-                    else:
-                        return SingleInstantTz(found, datetime, is_dst)
+                    return found, None if found is UTC else tuple(known)
                 else:
                     raise AmbiguousTimezone(distinct, timezones, datetime, is_dst, country, unsafe)
 
+    def __cache_key(self, timezones, datetime, is_dst, country, unsafe):
+        '''
+        Searches give the same result for all times between two transitions
+        in the timezones involved (for the same arguments), so results are
+        cached using a key that identifies that period.
+
+        :param timezones: The timezones passed to the search method.
+        :param datetime: The datetime passed to the search method.
+        :param is_dst: The DST flag passed to the search method.
+        :param country: The country code passed to the search method.
+        :param unsafe: The unsafe flag passed to the search method.
+        :return: A key for the cache, or `None` if the result cannot be
+                 cached.
+        '''
+        if datetime is None or not self.__cache_size:
+            return None
+        def normalize(tz):
+            if isinstance(tz, (tuple, list)):
+                return tuple(map(normalize, tz))
+            else:
+                hash(tz)
+                return tz
+        try:
+            args = (tuple(map(normalize, timezones)), is_dst,
+                    None if country is None else tuple(always_tuple(country)), unsafe)
+        except TypeError:
+            return None
+        try:
+            known = self.__transitions[args]
+        except KeyError:
+            if len(self.__transitions) >= self.__cache_size:
+                self.__transitions.clear()
+            known = self.__transitions[args] = self.__relevant_transitions(timezones, country)
+        if known is None:
+            return None
+        bucket = period(self.__index.instant(datetime), known)
+        return None if bucket is None else (args, bucket)
+
+    def __relevant_transitions(self, timezones, country):
+        '''
+        :param timezones: The timezones passed to the search method.
+        :param country: The country code passed to the search method.
+        :return: The (sorted) times of transitions in all timezones that
+                 could affect the result of a search, or `None` if some
+                 timezone is not understood.
+        '''
+        relevant = set()
+        if country is not None:
+            relevant.update(self.expand_country(*always_tuple(country)))
+        elif not timezones:
+            relevant.update(self.__all_zones())
+        def add(tz):
+            if isinstance(tz, (tuple, list)):
+                for value in tz: add(value)
+            elif tz is None:
+                relevant.add(get_localzone())
+            elif isinstance(tz, dt.tzinfo):
+                relevant.add(tz)
+            elif isinstance(tz, str):
+                try:
+                    relevant.add(timezone(tz))
+                except KeyError:
+                    pass
+                # abbreviations can match only zones that used the name at
+                # some time, or zones the index cannot help with.
+                relevant.update(self.__index.named(tz))
+        for tz in timezones:
+            add(tz)
+        found = set()
+        for tzinfo in relevant:
+            transitions = zone_transitions(tzinfo)
+            if transitions is None:
+                return None
+            found.update(transitions)
+        return sorted(found)
+
+    @staticmethod
+    def constant(tz):
+        '''
+        :param tz: A single timezone (as passed to `search()`).
+        :return: True if a (safe) search for `tz` alone gives the same
+                 result at all times.  Abbreviations (eg EST) do not.
+        '''
+        if isinstance(tz, str):
+            if '/' not in tz:
+                return False
+            try:
+                timezone(tz)
+                return True
+            except KeyError:
+                return False
+        return tz is None or isinstance(tz, (dt.tzinfo, dt.timedelta, int, float))
+
+    def cache_info(self):
+        '''
+        :return: The hits, misses, maximum size and current size of the cache
+                 of search results (like `functools.lru_cache`).
+        '''
+        return CacheInfo(self.__hits, self.__misses, self.__cache_size, len(self.__cache))
+
+    def cache_clear(self):
+        '''
+        Empty the cache of search results and reset the statistics.
+        '''
+        with self.__lock:
+            self.__cache.clear()
+            self.__transitions.clear()
+            self.__hits = self.__misses = 0
+
     def distinct(self, timezones, datetime=None, debug=False):
         '''
         :param timezones: Timezones to filter
@@ -530,9 +834,14 @@ class PyTzFactory(DebugLog):
         datetime = always_datetime(datetime)
         offsets = set()
 
-        for tz in timezones:
+        # offsets for all timezones from the index (where possible)
+        if datetime is not None:
+            timezones = list(timezones)
+            indexed = self.__index.offsets(timezones, self.__index.instant(datetime))
+
+        for i, tz in enumerate(timezones):
             if datetime is None:
-                log('Allowing single timezone without datetime: {0}', tz)
+                if log: log('Allowing single timezone without datetime: {0}', tz)
                 # this is a little tricksy, but allows us to handle a single
                 # timezone (which is distinct by definition)
                 if not offsets:
@@ -541,13 +850,16 @@ class PyTzFactory(DebugLog):
                     raise SimpleDateError('Need datetime to filter multiple timezones')
                 offsets.add(object())
             else:
-                offset = tzinfo_utcoffset(tz, datetime)
+                # seconds (an int from the index equals the float otherwise)
+                offset = indexed[i]
+                if offset is None:
+                    offset = tzinfo_utcoffset(tz, datetime).total_seconds()
                 if offset not in offsets:
-                    log('New offset {0} for {1}', offset, tz)
+                    if log: log('New offset {0}s for {1}', offset, tz)
                     yield tz
                     offsets.add(offset)
                 else:
-                    log('Known offset {0} for {1}', offset, tz)
+                    if log: log('Known offset {0}s for {1}', offset, tz)
 
     def expand_tz(self, *timezones, known=None, datetime=None, is_dst=False, debug=False):
         '''
@@ -578,15 +890,17 @@ class PyTzFactory(DebugLog):
         datetime = always_datetime(datetime)
         count = 0
 
+        try:
+            index = self.__index
+        except AttributeError:
+            index = None  # during construction
+
         if known is None:
-            known_set = None
-            try:
-                known_sorted = self.__sorted_zones
-            except AttributeError:
-                known_sorted = tuple()
+            # with no index (during construction) there is nothing known.
+            known_set, known_sorted = None, tuple()
         else:
             if not known:
-                log('No known zones for {0!r}', timezones)
+                if log: log('No known zones for {0!r}', timezones)
                 return
             else:
                 known_set = known
@@ -596,13 +910,13 @@ class PyTzFactory(DebugLog):
             nonlocal count
             # filter against `known`, if it exists.
             if known_set is None or tzinfo in known_set:
-                log('{0}: found {1}', message, tzinfo)
+                if log: log('{0}: found {1}', message, tzinfo)
                 count += 1
                 yield tzinfo
             else:
-                log('{0}: excluding {1}', message, tzinfo)
+                if log: log('{0}: excluding {1}', message, tzinfo)
 
-        log('Expanding {0!r}', timezones)
+        if log: log('Expanding {0!r}', timezones)
         for tz in timezones:
 
             if tz is None:
@@ -616,7 +930,7 @@ class PyTzFactory(DebugLog):
                 continue
 
             if isinstance(tz, dt.timedelta):
-                log('Converting {0} to minutes', tz)
+                if log: log('Converting {0} to minutes', tz)
                 seconds = tz.total_seconds()
                 if seconds % 60:
                     raise PyTzFactoryError('Time difference not a round number of minutes (%s)' % tz, timezones, datetime, is_dst)
@@ -624,7 +938,7 @@ class PyTzFactory(DebugLog):
                 # falls through to next section
 
             if isinstance(tz, int) or isinstance(tz, float):
-                log('Assuming {0} is minutes', tz)
+                if log: log('Assuming {0} is minutes', tz)
                 # yield from check('Fixed offset', FixedOffset(tz))
                 for tzinfo in check('Fixed offset', FixedOffset(tz)): yield tzinfo
                 continue
@@ -637,27 +951,75 @@ class PyTzFactory(DebugLog):
                     if datetime is None or '/' in tz:
                         continue
                 except KeyError:
-                    log('Name lookup failed for {0}', tz)
+                    if log: log('Name lookup failed for {0}', tz)
 
             if isinstance(tz, str):
                 if datetime is None:
                     raise PyTzFactoryError('Cannot expand limited timezone without datetime', timezones, datetime, is_dst)
-                for tzinfo in known_sorted:
+                # the index lets us skip timezones that never used the name
+                # (or only did so at other times), and accept those that
+                # clearly do, without calling tzinfo_tzname.
+                if index is None:
+                    candidates = ((tzinfo, None) for tzinfo in known_sorted)
+                else:
+                    instant = index.instant(datetime)
+                    if known_set is None:
+                        candidates = self.__recent_first(index, tz, instant)
+                    else:
+                        candidates = ((tzinfo, index.check(tz, tzinfo, instant)) for tzinfo in known_sorted)
+                for tzinfo, certain in candidates:
+                    if certain is False:
+                        continue
+                    elif certain:
+                        if log: log('Found {0} using {1} (indexed)', tz, tzinfo)
+                        count += 1
+                        yield tzinfo
+                        continue
                     try:
                         name = tzinfo_tzname(tzinfo, datetime, is_dst)
                         if tz == name:
-                            log('Found {0} using {1}', tz, tzinfo)
+                            if log: log('Found {0} using {1}', tz, tzinfo)
                             count += 1
                             yield tzinfo
                         else:
-                            log('{0} gave {1}', tzinfo, name)
+                            if log: log('{0} gave {1}', tzinfo, name)
                     except NonExistentTimeError as e:
-                        log('{0} / {1} ({2}) gave {3!r}', tz, datetime, is_dst, e)
+                        if log: log('{0} / {1} ({2}) gave {3!r}', tz, datetime, is_dst, e)
                 continue
 
             raise PyTzFactoryError('Cannot expand timezone {0!r}'.format(tz), timezones, datetime, is_dst)
 
-        log('Expanded timezone to {0} timezones', count)
+        if log: log('Expanded timezone to {0} timezones', count)
+
+    def __recent_first(self, index, tz, instant):
+        '''
+        The index orders candidates by name, but unsafe searches take the
+        first match, so zones that were returned recently are tried first
+        (as they were when all zones were searched in MRU order).
+
+        :param index: The index of timezone names.
+        :param tz: The name being expanded.
+        :param instant: The (index) instant of the search.
+        :return: A sequence of (tzinfo, certain) pairs (see `TzIndex.lookup()`).
+        '''
+        recent = tuple(tzinfo for tzinfo in self.__recent if tzinfo in index)
+        for tzinfo in recent:
+            certain = index.check(tz, tzinfo, instant)
+            if certain is not False:
+                yield tzinfo, certain
+        for tzinfo, certain in index.lookup(tz, instant):
+            if tzinfo not in recent:
+                yield tzinfo, certain
+
+    def __promote(self, tzinfo):
+        '''
+        Record that `tzinfo` was returned by an unsafe search (see
+        `__recent_first()`).  The tuple is replaced, not modified, so
+        concurrent searches see a consistent ordering.
+        '''
+        recent = self.__recent
+        if not recent or recent[0] is not tzinfo:
+            self.__recent = ((tzinfo,) + tuple(zone for zone in recent if zone is not tzinfo))[:MAX_RECENT]
 
     def expand_country(self, *countries, debug=False):
         '''
@@ -668,15 +1030,40 @@ class PyTzFactory(DebugLog):
         log = self._get_log(debug)
         count = 0
         for country in countries:
-            log('Have country code {0}', country)
+            if log: log('Have country code {0}', country)
             zones = country_timezones[country]
-            log('Country code {0} has {1} timezones', country, len(zones))
+            if log: log('Country code {0} has {1} timezones', country, len(zones))
             # yield from map(timezone, zones)
             for tzinfo in map(timezone, zones): yield tzinfo
             count += len(zones)
-        log('Expanded country codes to {0} timezones', count)
+        if log: log('Expanded country codes to {0} timezones', count)
 
-DEFAULT_TZ_FACTORY = PyTzFactory()
+# DEFAULT_TZ_FACTORY and DEFAULT_DATE_PARSER are created on first use (see
+# __getattr__; before python 3.7, on import) because building them is
+# relatively slow and not everyone needs them.
+DEFAULTS = {'DEFAULT_TZ_FACTORY': lambda: PyTzFactory(),
+            'DEFAULT_DATE_PARSER': lambda: SimpleDateParser()}
+
+def get_default(name, value=None):
+    '''
+    :param name: The name of a default (a key in DEFAULTS).
+    :param value: A value to use instead of the default, if not `None`.
+    :return: The value, or the default (created on first use).
+    '''
+    if value is None:
+        value = globals().get(name)
+        if value is None:
+            # another thread may have been first.
+            value = globals().setdefault(name, DEFAULTS[name]())
+    return value
+
+def __getattr__(name):
+    '''
+    Create the defaults on first access (as module attributes).
+    '''
+    if name in DEFAULTS:
+        return get_default(name)
+    raise AttributeError('module {0!r} has no attribute {1!r}'.format(__name__, name))
 
 
 class SimpleDateParser(DebugLog):
@@ -684,15 +1071,30 @@ class SimpleDateParser(DebugLog):
     Automate the parsing of SimpleDate instances from strings using a series
     of formats (until one works).
 
-    IMPORTANT: Not thread safe.
+    An instance can be shared between threads.
     '''
 
-    def __init__(self, formats=DEFAULT_FORMATS):
+    def __init__(self, formats=DEFAULT_FORMATS, stats=None, cache_size=100):
+        '''
+        :param formats: The formats to try (in order, although the format
+                        that last worked for a date of the same shape - or,
+                        for a new shape, the most recently successful - is
+                        tried first).
+        :param stats: A `simpledate.stats.Stats` instance to record the
+                      stages of each parse (`None` uses the global
+                      instance, if enabled).
+        :param cache_size: The number of shapes of date (see
+                           `simpledate.utils.shape()`) to remember (0
+                           disables).
+        :return: A new parser.
+        '''
         formats = tuple(map(auto_invert, always_tuple(formats)))
         self._formats = MRUSortedIterable(formats)
+        self._shapes = ShapeClassifier(formats, cache_size, Lock())
+        self.__stats = stats
 
     def parse(self, date,
-              tz=None, is_dst=False, country=None, tz_factory=DEFAULT_TZ_FACTORY,
+              tz=None, is_dst=False, country=None, tz_factory=None,
               unsafe=False, debug=False):
         '''
         Attempt to parse the string `date` using each format in turn, until
@@ -709,47 +1111,150 @@ class SimpleDateParser(DebugLog):
         :param country: A country code (or list of codes) to restrict the
                         choice of timezone.
         :param tz_factory: Converts from the timezone text, offset, etc, to a
-                           `dt.tzinfo` instance.
+                           `dt.tzinfo` instance (`None` is
+                           DEFAULT_TZ_FACTORY).
         :param unsafe: Take the first timezone found.
         :param debug: If true, print a description of the logic followed.
         :return: A datetime .
         '''
 
         log = self._get_log(debug)
+        tz_factory = get_default('DEFAULT_TZ_FACTORY', tz_factory)
+        def search(zones, datetime):
+            return tz_factory.search(*zones, datetime=datetime, is_dst=is_dst, country=country, unsafe=unsafe, debug=debug)
+        return self.__parse(date, tz, is_dst, search, log)
+
+    def parse_many(self, dates,
+                   tz=None, is_dst=False, country=None, tz_factory=None,
+                   unsafe=False, debug=False):
+        '''
+        Parse each string in `dates`, as `parse()`, generating the results in
+        turn.
+
+        This is faster than calling `parse()` repeatedly because the setup is
+        done once (and, when `tz_factory` is a `PyTzFactory`, timezone
+        searches are cached, so dates with the same timezone that fall
+        between the same pair of transitions share a single search).
 
-        for read_fmt in self._formats:
+        :param dates: The date strings to parse.
+        :param tz: A time zone to use if none available in the date (`None` is
+                   local).
+        :param is_dst: Is the date known to be summertime?  (`None` is
+                       'unknown').
+        :param country: A country code (or list of codes) to restrict the
+                        choice of timezone.
+        :param tz_factory: Converts from the timezone text, offset, etc, to a
+                           `dt.tzinfo` instance (`None` is
+                           DEFAULT_TZ_FACTORY).
+        :param unsafe: Take the first timezone found.
+        :param debug: If true, print a description of the logic followed.
+        :return: A sequence of (datetime, read format, write format) values.
+        '''
+
+        log = self._get_log(debug)
+        tz_factory = get_default('DEFAULT_TZ_FACTORY', tz_factory)
+        country = None if country is None else tuple(always_tuple(country))
+        def search(zones, datetime):
+            return tz_factory.search(*zones, datetime=datetime, is_dst=is_dst, country=country, unsafe=unsafe, debug=debug)
+
+        # dates without a timezone use `tz` and, if that is a complete zone
+        # (not an abbreviation), the result does not depend on the date, so
+        # is found once.
+        if not unsafe and isinstance(tz_factory, PyTzFactory) and tz_factory.constant(tz):
+            default, found = (tz,), []
+            def search(zones, datetime, search=search):
+                if zones != default:
+                    return search(zones, datetime)
+                if not found:
+                    found.append(search(zones, datetime))
+                return found[0]
+
+        for date in dates:
+            yield self.__parse(date, tz, is_dst, search, log)
+
+    def __parse(self, date, tz, is_dst, search, log):
+        '''
+        Parse a single date (the implementation of `parse()`).
+
+        :param date: The date string to parse.
+        :param tz: A time zone to use if none available in the date.
+        :param is_dst: Is the date known to be summertime?
+        :param search: Called with the zones and datetime to find the tzinfo.
+        :param log: The logger.
+        :return: The datetime and the formats (read and write) used.
+        '''
+
+        # a single regexp finds the first format that matches.  only if
+        # that fails later (eg an invalid date) do we need to continue,
+        # matching the remaining formats in turn.  most dates are ISO 8601,
+        # which has a faster path still for common layouts.  but first, if
+        # a date of the same shape has been parsed, we try the format that
+        # worked then on its own (and, if that fails, the combined regexp
+        # with that format first).
+        stats = active(self.__stats)
+        key = shape(date)
+        known = self._shapes.get(key)
+        formats = tuple(self._formats) if known is None else known[0]
+        parsed = None
+        if formats and formats[0] == ISO_8601[0]:
+            start = stats.start() if stats else 0
+            parsed = strptime_iso(date, formats[0])
+            if stats: stats.stop(ISO, start)
+        if parsed is None and known is not None:
+            parsed = strptime_known(date, known[1], stats)
+        if parsed is not None:
+            first = 0
+        else:
+            first, parsed = strptime_first(date, formats, stats)
+        if first == len(formats):
+            if log: log('Failed to match {0} with any format', date)
+        elif parsed is None:
+            if log: log('Failed to parse {0} with {1} (unconverted data remains)', date, formats[first])
+
+        for index in range(first + (parsed is None), len(formats)):
+            read_fmt = formats[index]
             try:
 
-                tt, fraction, write_fmt = strptime(date, read_fmt)
-                log('Raw parse results for {0}: {1!r}, {2!r}', read_fmt, tt, fraction)
-                datetime = dt.datetime(*(tt[:6] + (fraction,)))
+                if parsed is not None and index == first:
+                    tt, write_fmt = parsed
+                else:
+                    tt, write_fmt = strptime_lazy(date, read_fmt, stats)
+                if log: log('Raw parse results for {0}: {1!r}', read_fmt, tt)
+                datetime = dt.datetime(tt.year, tt.month, tt.day, tt.hour, tt.minute, tt.second, tt.fraction)
 
-                zone = tt[-2]
+                zone = tt.tzname
                 if zone is not None:
-                    log('Parsed timezone name from date as {0}', zone)
-                elif tt[-1]:
-                        zone = dt.timedelta(seconds=tt[-1])
-                        log('Parsed timezone offset from date as {0}', zone)
+                    if log: log('Parsed timezone name from date as {0}', zone)
+                elif tt.gmtoff:
+                        zone = dt.timedelta(seconds=tt.gmtoff)
+                        if log: log('Parsed timezone offset from date as {0}', zone)
 
                 zones = ()
                 if zone is not None: zones += (zone,)
                 if tz is not None: zones += (tz,)
                 if not zones: zones += (None,)  # use locale
-                log('Combined zones are {0}', zones)
+                if log: log('Combined zones are {0}', zones)
 
-                tzinfo = tz_factory.search(*zones, datetime=datetime, is_dst=is_dst, country=country, unsafe=unsafe, debug=debug)
-                log('Resolved timezone as {0}', tzinfo)
+                tzinfo = search(zones, datetime)
+                if log: log('Resolved timezone as {0}', tzinfo)
 
+                start = stats.start() if stats else 0
                 datetime = tzinfo_localize(tzinfo, datetime, is_dst)
-                log('Parsed {0} with {1} to give {2} / {3}', date, read_fmt, datetime, tzinfo)
+                if stats: stats.stop(LOCALIZE, start)
+                if log: log('Parsed {0} with {1} to give {2} / {3}', date, read_fmt, datetime, tzinfo)
+                self._formats.promote(read_fmt)
+                # learn only from the format that matched first.  a later
+                # format may work because the date is invalid (or the match
+                # partial) for that one, and would then be wrong for valid
+                # dates of the same shape.
+                if index == first and parsed is not None and (known is None or known[0][0] != read_fmt):
+                    self._shapes.learn(key, read_fmt, _to_regexp_full(read_fmt))
                 return datetime, read_fmt, write_fmt
 
             except ValueError as e:
-                log('Failed to parse {0} with {1} ({2})', date, read_fmt, e)
+                if log: log('Failed to parse {0} with {1} ({2})', date, read_fmt, e)
         raise SimpleDateError('Could not parse {0}', date)
 
-DEFAULT_DATE_PARSER = SimpleDateParser()
-
 
 class DateTimeWrapper:
     '''
@@ -873,7 +1378,7 @@ class DateTimeWrapper:
 
     def __add__(self, other):
         if isinstance(other, dt.timedelta):
-            return SimpleDate(datetime=self.__datetime+other, format=self.__format)
+            return SimpleDate._from_wrapper(self.__datetime+other, self.__format)
         else: return NotImplemented
 
     __radd__ = __add__
@@ -881,7 +1386,7 @@ class DateTimeWrapper:
     def __sub__(self, other):
         if isinstance(other, DateTimeWrapper): return self.__datetime - other.__datetime
         elif isinstance(other, dt.timedelta):
-            return SimpleDate(datetime=self.datetime-other, format=self.format)
+            return SimpleDate._from_wrapper(self.__datetime-other, self.__format)
         else: return NotImplemented
 
 
@@ -908,7 +1413,7 @@ class SimpleDate(DateTimeWrapper, DebugLog):
 
     def __init__(self, year_or_auto=None, month=None, day=None, hour=None, minute=None, second=None, microsecond=None,
                  simple=None, datetime=None, date=None, ordinal=None, time=None, timestamp=None,
-                 tz=None, is_dst=False, country=None, tz_factory=DEFAULT_TZ_FACTORY, unsafe=False,
+                 tz=None, is_dst=False, country=None, tz_factory=None, unsafe=False,
                  format=None, date_parser=None, debug=False):
         '''
         Simple use may only require passing the first parameter, which will
@@ -991,6 +1496,7 @@ class SimpleDate(DateTimeWrapper, DebugLog):
 
         log = self._get_log(debug)
         format = auto_invert(format, log)
+        tz_factory = get_default('DEFAULT_TZ_FACTORY', tz_factory)
 
         # gentle reader, this may look like a huge, impenetrable block of
         # code, but it's actually not doing anything clever - just many small
@@ -1007,37 +1513,37 @@ class SimpleDate(DateTimeWrapper, DebugLog):
 
         if test_all(is_none, month, day, hour, minute, second, microsecond,
                 simple, time, date, datetime, timestamp, ordinal):
-            log('Inferring auto argument')
+            if log: log('Inferring auto argument')
             if isinstance(year_or_auto, SimpleDate):
-                log('Found a DTime instance')
+                if log: log('Found a DTime instance')
                 simple, year_or_auto = year_or_auto, None
             # ordering important here as issubclass(datetime, date)
             elif isinstance(year_or_auto, dt.datetime):
-                log('Found a datetime instance')
+                if log: log('Found a datetime instance')
                 datetime, year_or_auto = year_or_auto, None
             elif isinstance(year_or_auto, dt.date):
-                log('Found a date instance')
+                if log: log('Found a date instance')
                 date, year_or_auto = year_or_auto, None
             elif isinstance(year_or_auto, dt.time):
-                log('Found a time instance')
+                if log: log('Found a time instance')
                 time, year_or_auto = year_or_auto, None
             elif isinstance(year_or_auto, int) or isinstance(year_or_auto, float):
-                log('Found a numeric value, will use as Unix epoch')
+                if log: log('Found a numeric value, will use as Unix epoch')
                 timestamp, year_or_auto = year_or_auto, None
             elif isinstance(year_or_auto, str):
                 # if we have a string, use `date_parser` to create a SimpleDate
                 # instance (passing `tz`, `format`, etc) and then clear
                 # everything else.
-                log('Found a string, will try to parse')
+                if log: log('Found a string, will try to parse')
                 if date_parser is None:
                     if format:
-                        log('Creating date parser with given format plus defaults')
+                        if log: log('Creating date parser with given format plus defaults')
                         date_parser = SimpleDateParser(always_tuple(format) + DEFAULT_FORMATS)
                     else:
-                        log('Using default date parser')
-                        date_parser = DEFAULT_DATE_PARSER
+                        if log: log('Using default date parser')
+                        date_parser = get_default('DEFAULT_DATE_PARSER')
                 else:
-                    log('Using given date parser')
+                    if log: log('Using given date parser')
                 datetime, read_fmt, write_fmt = date_parser.parse(year_or_auto, tz=tz, is_dst=is_dst, country=country, tz_factory=tz_factory, unsafe=unsafe, debug=debug)
                 year_or_auto, tz = None, None  # clear tz so it's not re-checked later
                 # if someone supplied a single format, always use it for writes.
@@ -1050,7 +1556,7 @@ class SimpleDate(DateTimeWrapper, DebugLog):
                         format = write_fmt
                     else:
                         format = strip(format)
-                        log('Format was not used to parse, so strip to {0}', format)
+                        if log: log('Format was not used to parse, so strip to {0}', format)
             elif year_or_auto is not None:
                 raise SimpleDateError('Cannot convert {0!r} for year_or_auto', year_or_auto)
 
@@ -1070,7 +1576,7 @@ class SimpleDate(DateTimeWrapper, DebugLog):
             # to next case below (combining with time).
             if date is None and ordinal is not None:
                 date = dt.date.fromordinal(ordinal)
-                log('Converted ordinal {0} to date {1}', ordinal, date)
+                if log: log('Converted ordinal {0} to date {1}', ordinal, date)
                 ordinal = None
 
             # special case - combine date and/or time into datetime
@@ -1081,29 +1587,29 @@ class SimpleDate(DateTimeWrapper, DebugLog):
                     # we know date is defined, so use a zero time in the
                     # datetime to bootstrap the tz
                     tzinfo = tz_factory.search(tz, datetime=dt.datetime.combine(date, dt.time()), is_dst=is_dst, country=country, unsafe=unsafe, debug=debug)
-                    log('Have a date, but no time, so using midnight in {0}', tzinfo)
+                    if log: log('Have a date, but no time, so using midnight in {0}', tzinfo)
                     time = dt.time(tzinfo=tzinfo)
                 elif time.tzinfo is None:
                     # similarly, fix a naive time (TODO - we use today's UTC date - that may not be right?)
                     tzinfo = tz_factory.search(tz, datetime=dt.datetime.combine(dt.datetime.utcnow().date(), time), is_dst=is_dst, country=country, unsafe=unsafe, debug=debug)
-                    log('Setting timezone for time to {0}', tzinfo)
+                    if log: log('Setting timezone for time to {0}', tzinfo)
                     time = time.replace(tzinfo=tzinfo)
                 # so now we have a time that is guaranteed to exist and have
                 # a valid tzinfo
                 if date is None:
-                    log('Have a time, but no date, so using today')
+                    if log: log('Have a time, but no date, so using today')
                     date = dt.datetime.now(tz=time.tzinfo).date()
-                log('Combining date and time')
+                if log: log('Combining date and time')
                 datetime = reapply_tzinfo(dt.datetime.combine(date, time), is_dst)
                 date, time = None, None
 
             # move simple to datetime here so that we can check tz below
             if simple is not None:
                 datetime = simple.datetime
-                log('Using datetime from simple: {0}', datetime)
+                if log: log('Using datetime from simple: {0}', datetime)
                 if not format:
                     format = simple.format
-                    log('Using format from simple: {0}', format)
+                    if log: log('Using format from simple: {0}', format)
                 simple = None
 
             # with the special cases handled (and reduced to a single
@@ -1113,7 +1619,7 @@ class SimpleDate(DateTimeWrapper, DebugLog):
             multiple = names(2, is_not_none, simple=simple, time=time, date=date, datetime=datetime, epoch=timestamp)
             if multiple:
                 args = ', '.join(multiple)
-                log('Too many, possibly contradicting, values: {0}', args)
+                if log: log('Too many, possibly contradicting, values: {0}', args)
                 raise SimpleDateError('Cannot specify ' + args + ' together')
 
             # pick off the remaining parameters, one by one.
@@ -1127,7 +1633,7 @@ class SimpleDate(DateTimeWrapper, DebugLog):
             elif date is not None:
                 raise SimpleDateError('Inconsistent code: date should already have been converted')
             elif timestamp is not None:
-                log('Converting Unix epoch to datetime')
+                if log: log('Converting Unix epoch to datetime')
                 datetime = dt.datetime.fromtimestamp(timestamp, tz=utc)
                 tzinfo = tz_factory.search(tz, datetime=datetime, is_dst=is_dst, country=country, unsafe=unsafe, debug=debug)
                 datetime, timestamp = dt.datetime.fromtimestamp(timestamp, tz=tzinfo), None
@@ -1135,7 +1641,7 @@ class SimpleDate(DateTimeWrapper, DebugLog):
             elif ordinal is not None:
                 raise SimpleDateError('Inconsistent code: ordinal should already have been converted')
             elif datetime is None:
-                log('Constructing a new datetime using now')
+                if log: log('Constructing a new datetime using now')
                 datetime = dt.datetime.utcnow().replace(tzinfo=utc)
                 tzinfo = tz_factory.search(tz, datetime=datetime, is_dst=is_dst, country=country, unsafe=unsafe, debug=debug)
                 datetime = datetime.astimezone(tzinfo)
@@ -1155,7 +1661,7 @@ class SimpleDate(DateTimeWrapper, DebugLog):
                 else:
                     raise SimpleDateError('Name multiple parameters if they are not year, month, day etc.')
 
-            log('Constructor was called with explicit year, month, day, etc.')
+            if log: log('Constructor was called with explicit year, month, day, etc.')
             if test_any(is_none, year_or_auto, month, day):
                 if test_all(is_int_or_none, year_or_auto, month, day):
                     raise SimpleDateError('The year, month and day must all be provided')
@@ -1166,13 +1672,13 @@ class SimpleDate(DateTimeWrapper, DebugLog):
                                 ('hour', hour), ('day', day), ('month', month), ('year', year_or_auto)])
             for name, value in spec.items():
                 if value is None:
-                    log('Default ' + name + ' to zero')
+                    if log: log('Default {0} to zero', name)
                     spec[name] = 0
                 else: break  # don't allow gaps
             error = names(1, is_none, **spec)
             if error: raise SimpleDateError('Missing value{0} for {1}', 's' if len(error) > 1 else '', ', '.join(error))
 
-            log('Constructing datetime from: {0}', '; '.join('%s: %s' % (name, value) for name, value in reversed(list(spec.items()))))
+            if log: log('Constructing datetime from: {0}', '; '.join('%s: %s' % (name, value) for name, value in reversed(list(spec.items()))))
             datetime = dt.datetime(**spec)
             year_or_auto, month, day, hour, minute, second, microsecond = None, None, None, None, None, None ,None
 
@@ -1193,29 +1699,95 @@ class SimpleDate(DateTimeWrapper, DebugLog):
 
         format = strip(auto_invert(single_format(format)))
         if not format:
-            log('Using default format ({0})', DEFAULT_FORMAT)
+            if log: log('Using default format ({0})', DEFAULT_FORMAT)
             format = DEFAULT_FORMAT
         super().__init__(datetime, format)
 
-        log('Created {0}', self)
+        if log: log('Created {0}', self)
+
+    @classmethod
+    def _from_parts(cls, datetime, format):
+        '''
+        A fast constructor for internal use, which skips all checks.
+
+        :param datetime: A datetime with tzinfo.
+        :param format: The format used for output (normalised as by the
+                       constructor, so `None` or empty is DEFAULT_FORMAT).
+        :return: A new instance.
+        '''
+        self = cls.__new__(cls)
+        DateTimeWrapper.__init__(self, datetime, strip(auto_invert(single_format(format))) or DEFAULT_FORMAT)
+        return self
+
+    @classmethod
+    def _from_wrapper(cls, datetime, format):
+        '''
+        :param datetime: A datetime from a `DateTimeWrapper`.
+        :param format: The format of the wrapper.
+        :return: A new instance (naive values are localized as by the
+                 constructor).
+        '''
+        if datetime.tzinfo is None:
+            return cls(datetime=datetime, format=format)
+        else:
+            return cls._from_parts(datetime, format)
+
+    @classmethod
+    def from_strings(cls, dates, tz=None, is_dst=False, country=None, tz_factory=None, unsafe=False,
+                     format=None, date_parser=None, debug=False):
+        '''
+        Parse each string in `dates`, generating SimpleDate instances.  The
+        results are the same as calling `SimpleDate(date, ...)` for each
+        value, but this is faster (see `SimpleDateParser.parse_many()`).
+
+        :param dates: The date strings to parse.
+        :param tz: A time zone to use if none available in the date (`None` is local).
+        :param is_dst: Whether the time being processed is DST.
+        :param country: A country code (or list of codes) to restrict the choice of timezone.
+        :param tz_factory: Used to convert anything parsed from an input string to a `dt.tzinfo` instance.
+        :param unsafe: Take the first timezone found.
+        :param format: The format used for output (also used to parse input strings if `date_parser` is `None`).
+        :param date_parser: Used to parse the input strings (default DEFAULT_DATE_PARSER, combined with `format` if given).
+        :param debug: If true, print a description of the logic followed.
+        :return: A sequence of SimpleDate instances.
+        '''
+        format = auto_invert(format)
+        if date_parser is None:
+            if format:
+                date_parser = SimpleDateParser(always_tuple(format) + DEFAULT_FORMATS)
+            else:
+                date_parser = get_default('DEFAULT_DATE_PARSER')
+        format = single_format(format)
+        for datetime, read_fmt, write_fmt in \
+                date_parser.parse_many(dates, tz=tz, is_dst=is_dst, country=country, tz_factory=tz_factory, unsafe=unsafe, debug=debug):
+            # as the constructor, use a single format for writes if given.
+            if format is None or format == read_fmt:
+                yield cls._from_parts(datetime, write_fmt)
+            else:
+                yield cls(datetime, format=strip(format), debug=debug)
 
-    def convert(self, tz=None, format=None, is_dst=False, country=None, tz_factory=DEFAULT_TZ_FACTORY, unsafe=False, debug=False):
+    def convert(self, tz=None, format=None, is_dst=False, country=None, tz_factory=None, unsafe=False, debug=False):
         if tz is None and country is None:
             # avoid expanding this, because it might be a SingleInstantTimezone
             tz = self.tzinfo
         else:
             zones = () if tz is None else (tz,)
-            tz = tz_factory.search(*zones, datetime=self.datetime, is_dst=is_dst, country=country, unsafe=unsafe, debug=debug)
-        if format is None: format = self.format
-        return SimpleDate(datetime=tz.normalize(self.datetime.astimezone(tz)), format=format)
+            tz = get_default('DEFAULT_TZ_FACTORY', tz_factory).search(*zones, datetime=self.datetime, is_dst=is_dst, country=country, unsafe=unsafe, debug=debug)
+        datetime = tz.normalize(self.datetime.astimezone(tz))
+        if format is None:
+            return SimpleDate._from_parts(datetime, self.format)
+        else:
+            return SimpleDate(datetime=datetime, format=format)
 
     def replace(self, year=None, month=None, day=None, hour=None, minute=None, second=None, microsecond=None,
-                tz=None, format=None, is_dst=False, country=None, tz_factory=DEFAULT_TZ_FACTORY, unsafe=False, debug=False):
+                tz=None, format=None, is_dst=False, country=None, tz_factory=None, unsafe=False, debug=False):
         datetime = self.datetime.replace(**set_kargs_only(year=year, month=month, day=day, hour=hour, minute=minute, second=second, microsecond=microsecond))
-        if tz is None:
-            return SimpleDate(datetime, format=self.format if format is None else format)
+        if tz is None and format is None:
+            return SimpleDate._from_parts(datetime, self.format)
+        elif tz is None:
+            return SimpleDate(datetime, format=format)
         else:
-            tzinfo = tz_factory.search(tz, datetime=datetime.replace(tzinfo=None), is_dst=is_dst, country=country, unsafe=unsafe, debug=debug)
+            tzinfo = get_default('DEFAULT_TZ_FACTORY', tz_factory).search(tz, datetime=datetime.replace(tzinfo=None), is_dst=is_dst, country=country, unsafe=unsafe, debug=debug)
             return SimpleDate(datetime, tz=tzinfo, format=self.format if format is None else format)
 
 
@@ -1228,22 +1800,30 @@ class SimpleDate(DateTimeWrapper, DebugLog):
         return self.convert(utc, format=DEFAULT_FORMAT)
 
 
-FACTORIES = local()
+FACTORIES = {}
 
-def get_local(name, builder):
+def get_shared(name, builder):
     '''
-    Helper for thread local data.
+    Helper for data shared by all threads.
 
-    :param name: The name of the attribute to get.
+    :param name: The name of the value to get.
     :param builder: A thunk to evaluate to generate the default value if missing.
-    :return: The current value of the attribute.
+    :return: The current value.
     '''
-    value = getattr(FACTORIES, name, None)
+    value = FACTORIES.get(name)
     if value is None:
-        value = builder()
-        setattr(FACTORIES, name, value)
+        # another thread may have been first.
+        value = FACTORIES.setdefault(name, builder())
     return value
 
+def get_local(name, builder):
+    '''
+    Deprecated alias for `get_shared()` (values were once thread local, but
+    are now shared by all threads).
+    '''
+    warn('get_local() is deprecated; use get_shared()', DeprecationWarning, stacklevel=2)
+    return get_shared(name, builder)
+
 def best_guess_utc(date, debug=False):
     '''
     Try US timezones with US formats, then everything else.
@@ -1252,13 +1832,18 @@ def best_guess_utc(date, debug=False):
     :param debug: If true, print a description of the logic followed.
     :return: A UTC datetime.
     '''
-    us_date_parser = get_local('us_date_parser', lambda: SimpleDateParser(MDY + DEFAULT_FORMATS))
-    eu_date_parser = get_local('eu_date_parser', lambda: SimpleDateParser(DMY + DEFAULT_FORMATS))
-    us_tz_factory = get_local('us_tz_factory', lambda: PyTzFactory(all_timezones, countries=['US']))
-    eu_tz_factory = get_local('eu_tz_factory', lambda: PyTzFactory(all_timezones, countries=exclude('US')))
+    us_date_parser = get_shared('us_date_parser', lambda: SimpleDateParser(MDY + DEFAULT_FORMATS))
+    eu_date_parser = get_shared('eu_date_parser', lambda: SimpleDateParser(DMY + DEFAULT_FORMATS))
+    us_tz_factory = get_shared('us_tz_factory', lambda: PyTzFactory(all_timezones, countries=['US']))
+    eu_tz_factory = get_shared('eu_tz_factory', lambda: PyTzFactory(all_timezones, countries=exclude('US')))
     try:
         date = SimpleDate(date, date_parser=us_date_parser, tz_factory=us_tz_factory, unsafe=True, debug=debug)
     except SimpleDateError:
         date = SimpleDate(date, date_parser=eu_date_parser, tz_factory=eu_tz_factory, unsafe=True, debug=debug)
     return date.utc.datetime
 
+
+# the module __getattr__ above (PEP 562) needs python 3.7, so on earlier
+# versions the defaults are created on import.
+if sys.version_info < (3, 7):
+    list(map(get_default, DEFAULTS))
@@ -0,0 +1,148 @@
+
+import asyncio
+from simpledate import SimpleDate, SimpleDateParser, SimpleDateError, DEFAULT_FORMATS, get_default
+from simpledate.fmt import auto_invert
+from simpledate.utils import always_tuple
+
+
+# Parse dates from an asynchronous source (eg lines from a log tailer or a
+# network stream), for use with asyncio:
+#
+#   async for date in parse_stream(reader, tz='UTC'):
+#       ...
+#
+# Lines are collected into batches, which are parsed together (with
+# `SimpleDate.from_strings()` or `SimpleDateParser.parse_many()`) either in
+# the event loop or, if an executor is given, in another thread.  Nothing
+# is read until the consumer asks for a result, so a slow consumer slows
+# the reads, and at most one batch of lines (and their results) is held.
+
+# (c) 2013 Andrew Cooke (andrew@acooke.org)
+# Released into the public domain for any use, but with absolutely no warranty.
+
+
+def _to_string(line):
+    '''
+    :param line: A line of text or bytes (eg from `asyncio.StreamReader`).
+    :return: The line as a string, without surrounding whitespace.
+    '''
+    if isinstance(line, bytes):
+        line = line.decode('utf8')
+    return line.strip()
+
+
+def _batch_parser(compact, tz, is_dst, country, tz_factory, unsafe, format, date_parser, debug):
+    '''
+    :return: A function that parses a batch of lines, returning a list of
+             results and the error (or `None`) that stopped the parse.
+    '''
+    if compact:
+        date_parser = get_default('DEFAULT_DATE_PARSER', date_parser)
+        def parse_many(dates):
+            return date_parser.parse_many(dates, tz=tz, is_dst=is_dst, country=country, tz_factory=tz_factory,
+                                          unsafe=unsafe, debug=debug)
+    else:
+        if date_parser is None and format:
+            # create the parser once, rather than for each batch.
+            date_parser = SimpleDateParser(always_tuple(auto_invert(format)) + DEFAULT_FORMATS)
+        def parse_many(dates):
+            return SimpleDate.from_strings(dates, tz=tz, is_dst=is_dst, country=country, tz_factory=tz_factory,
+                                           unsafe=unsafe, format=format, date_parser=date_parser, debug=debug)
+    def parse(lines):
+        results = []
+        try:
+            for result in parse_many(map(_to_string, lines)):
+                results.append(result)
+        except SimpleDateError as error:
+            return results, error
+        return results, None
+    return parse
+
+
+async def _read(source, pending, batch_size, wait):
+    '''
+    :param source: An asynchronous iterator of lines.
+    :param pending: A task reading the next line (or `None`).
+    :param batch_size: The maximum number of lines to read.
+    :param wait: The time (seconds) to wait for more lines, once some have
+                 been read (`None` to wait until the batch is full).
+    :return: The lines, a task that is still reading (or `None`) and
+             whether the source is exhausted.
+    '''
+    lines = []
+    try:
+        while len(lines) < batch_size:
+            if wait is None:
+                lines.append(await source.__anext__())
+            else:
+                if pending is None:
+                    pending = asyncio.ensure_future(source.__anext__())
+                if lines and not pending.done():
+                    await asyncio.sleep(0)  # often enough for a line that is ready
+                    if not pending.done():
+                        done, _ = await asyncio.wait((pending,), timeout=wait)
+                        if not done:
+                            break
+                line, pending = await pending, None
+                lines.append(line)
+    except StopAsyncIteration:
+        return lines, None, True
+    return lines, pending, False
+
+
+async def parse_stream(lines, tz=None, is_dst=False, country=None, tz_factory=None, unsafe=False,
+                       format=None, date_parser=None, debug=False,
+                       compact=False, batch_size=100, wait=None, executor=None):
+    '''
+    Parse each line from an asynchronous source, generating the results in
+    turn (asynchronously).  The results are the same as calling
+    `SimpleDate.from_strings()` (or, if `compact` is true,
+    `SimpleDateParser.parse_many()`) with all the lines.
+
+    Lines are read in batches of `batch_size`, so the event loop is
+    blocked for at most one batch (or not at all, if `executor` is given).
+    A parse error is raised after the results for the earlier lines.
+
+    :param lines: An asynchronous iterable of strings or bytes (surrounding
+                  whitespace, like the newline, is discarded).
+    :param tz: A time zone to use if none available in the date (`None` is local).
+    :param is_dst: Whether the time being processed is DST.
+    :param country: A country code (or list of codes) to restrict the choice of timezone.
+    :param tz_factory: Used to convert anything parsed from an input string to a `dt.tzinfo` instance.
+    :param unsafe: Take the first timezone found.
+    :param format: The format used for output (also used to parse input strings if `date_parser` is `None`).
+    :param date_parser: Used to parse the input strings (default DEFAULT_DATE_PARSER, combined with `format` if given).
+    :param debug: If true, print a description of the logic followed.
+    :param compact: If true, generate (datetime, read format, write format)
+                    tuples instead of SimpleDate instances (`format` is
+                    ignored).
+    :param batch_size: The maximum number of lines parsed together.
+    :param wait: The time (seconds) to wait for a batch to fill before
+                 parsing the lines already read (`None` waits until the
+                 batch is full or the source is exhausted).  Set this for
+                 sources that can pause (eg a log tailer).
+    :param executor: A `concurrent.futures.Executor` (eg a
+                     `ThreadPoolExecutor`) in which to parse each batch
+                     (`None` parses in the event loop).
+    :return: An asynchronous iterator of SimpleDate instances (or tuples).
+    '''
+    if batch_size < 1:
+        raise ValueError('batch_size must be positive')
+    parse = _batch_parser(compact, tz, is_dst, country, tz_factory, unsafe, format, date_parser, debug)
+    source, pending, exhausted = lines.__aiter__(), None, False
+    try:
+        while not exhausted:
+            batch, pending, exhausted = await _read(source, pending, batch_size, wait)
+            if not batch:
+                break
+            if executor is None:
+                results, error = parse(batch)
+            else:
+                results, error = await asyncio.get_running_loop().run_in_executor(executor, parse, batch)
+            for result in results:
+                yield result
+            if error is not None:
+                raise error
+    finally:
+        if pending is not None:
+            pending.cancel()
@@ -0,0 +1,70 @@
+
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from unittest import TestCase
+from simpledate import SimpleDate, SimpleDateError, SimpleDateParser
+from simpledate.aio import parse_stream
+
+
+async def source(lines, read=None):
+    for line in lines:
+        if read is not None: read.append(line)
+        yield line
+
+
+async def collect(results):
+    return [result async for result in results]
+
+
+class ParseStreamTest(TestCase):
+
+    def test_dates(self):
+        lines = ['2013-06-08 12:34:56 UTC\n', b'Sat, 08 Jun 2013 12:34:56 UTC\n', '2013-06-09 12:34:56 UTC']
+        dates = asyncio.run(collect(parse_stream(source(lines), batch_size=2)))
+        assert dates == list(SimpleDate.from_strings(line.strip() if isinstance(line, str) else line.decode().strip()
+                                                     for line in lines)), dates
+        assert dates[1].datetime == dates[0].datetime, dates
+
+    def test_compact(self):
+        parser = SimpleDateParser()
+        with ThreadPoolExecutor(1) as executor:
+            results = asyncio.run(collect(parse_stream(source(['2013-06-08 12:34 UTC'] * 5), date_parser=parser,
+                                                       compact=True, batch_size=2, executor=executor)))
+        assert len(results) == 5, results
+        datetime, read_fmt, write_fmt = results[0]
+        assert write_fmt == '%Y-%m-%d %H:%M %Z' and datetime.hour == 12, results[0]
+
+    def test_error(self):
+        async def run():
+            dates = []
+            with self.assertRaises(SimpleDateError):
+                async for date in parse_stream(source(['2013-06-08 UTC', 'junk', '2013-06-09 UTC'])):
+                    dates.append(date)
+            return dates
+        dates = asyncio.run(run())
+        assert [date.day for date in dates] == [8], dates
+
+    def test_backpressure(self):
+        read = []
+        async def run():
+            dates = parse_stream(source(['2013-06-08 UTC'] * 10, read), batch_size=3)
+            await dates.__anext__()
+            assert len(read) == 3, read  # only the first batch
+            await dates.aclose()
+        asyncio.run(run())
+
+    def test_wait(self):
+        # the source pauses until the consumer has seen the first dates
+        async def run():
+            seen = asyncio.Event()
+            async def paused():
+                yield '2013-06-08 UTC'
+                yield '2013-06-09 UTC'
+                await seen.wait()
+                yield '2013-06-10 UTC'
+            dates = []
+            async for date in parse_stream(paused(), batch_size=10, wait=0.01):
+                dates.append(date.day)
+                seen.set()
+            return dates
+        assert asyncio.run(asyncio.wait_for(run(), 5)) == [8, 9, 10]
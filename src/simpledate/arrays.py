@@ -0,0 +1,202 @@
+
+from array import array
+import datetime as dt
+from pytz import utc
+from simpledate import SimpleDate, SingleInstantTz, get_default, single_format
+from simpledate.fmt import auto_invert, strip
+
+
+# A compact, columnar alternative to a list of SimpleDate instances.  Each
+# date is stored as UTC microseconds and indices into tables of timezones
+# and formats (shared by slices and copies), and a SimpleDate is created only
+# when an item is accessed.
+
+# (c) 2013 Andrew Cooke (andrew@acooke.org)
+# Released into the public domain for any use, but with absolutely no warranty.
+
+
+EPOCH = dt.datetime(1970, 1, 1, tzinfo=utc)
+ONE_MICROSECOND = dt.timedelta(microseconds=1)
+
+
+class Table:
+    '''
+    An append-only table of values, each identified by its index.
+    '''
+
+    def __init__(self):
+        self.values = []
+        self.__ids = {}
+
+    def id(self, key, value):
+        '''
+        :param key: A hashable key for the value.
+        :param value: The value to store, if the key is new.
+        :return: The index of the value with that key.
+        '''
+        try:
+            return self.__ids[key]
+        except KeyError:
+            self.values.append(value)
+            return self.__ids.setdefault(key, len(self.values) - 1)
+
+
+class SimpleDateArray:
+    '''
+    A sequence of SimpleDate values, stored as arrays of UTC microseconds
+    (int64), timezone ids and format ids (int32, into shared tables).
+
+    Timezones that are valid only at a single instant (`SingleInstantTz`)
+    are stored by offset and name, and re-created for each date on access.
+    Those valid over an interval (`IntervalTz`, typically from an
+    abbreviation) are shared by all dates in the interval.
+    '''
+
+    def __init__(self, dates=(), tables=None):
+        '''
+        :param dates: SimpleDate instances.
+        :param tables: The timezone and format tables (shared with another
+                       array).
+        :return: A new array.
+        '''
+        self.__times = array('q')
+        self.__zones = array('i')
+        self.__formats = array('i')
+        self.__tables = (Table(), Table()) if tables is None else tables
+        self.extend(dates)
+
+    @classmethod
+    def from_strings(cls, dates, **kargs):
+        '''
+        Parse each string in `dates` (see `SimpleDate.from_strings()`, which
+        takes the same arguments).
+
+        :param dates: The date strings to parse.
+        :return: A new array.
+        '''
+        return cls(SimpleDate.from_strings(dates, **kargs))
+
+    def __zone_id(self, tzinfo, datetime):
+        '''
+        :param tzinfo: The timezone of a date.
+        :param datetime: The date.
+        :return: The id of the timezone in the table of (tzinfo, single)
+                 pairs.
+        '''
+        # an IntervalTz may be open at either end (no earlier or later
+        # transition).
+        if isinstance(tzinfo, SingleInstantTz) and tzinfo.start is not None and \
+                tzinfo.end is not None and tzinfo.end - tzinfo.start == ONE_MICROSECOND:
+            offset, name = tzinfo.utcoffset(datetime), tzinfo.tzname(datetime)
+            return self.__tables[0].id((offset, name), (dt.timezone(offset, name), True))
+        else:
+            return self.__tables[0].id(tzinfo, (tzinfo, False))
+
+    def append(self, date):
+        '''
+        :param date: A SimpleDate to add to the end of the array.
+        '''
+        datetime = date.datetime
+        self.__times.append((datetime - EPOCH) // ONE_MICROSECOND)
+        self.__zones.append(self.__zone_id(datetime.tzinfo, datetime))
+        self.__formats.append(self.__tables[1].id(date.format, date.format))
+
+    def extend(self, dates):
+        '''
+        :param dates: SimpleDate instances to add to the end of the array.
+        '''
+        for date in dates:
+            self.append(date)
+
+    @property
+    def times(self):
+        '''
+        :return: The UTC microseconds since the epoch for each date (a copy).
+        '''
+        return array('q', self.__times)
+
+    def __len__(self):
+        return len(self.__times)
+
+    def __datetime(self, index):
+        '''
+        :param index: The index of a date.
+        :return: The datetime and a flag that is true if the timezone is
+                 valid only at this instant.
+        '''
+        tzinfo, single = self.__tables[0].values[self.__zones[index]]
+        datetime = EPOCH + dt.timedelta(microseconds=self.__times[index])
+        return datetime.astimezone(tzinfo), single
+
+    def __getitem__(self, index):
+        '''
+        :param index: An index or slice.
+        :return: A SimpleDate, or a new array for a slice.
+        '''
+        if isinstance(index, slice):
+            return self.__select(range(len(self))[index])
+        datetime, single = self.__datetime(index)
+        if single:
+            datetime = datetime.replace(tzinfo=SingleInstantTz(datetime.tzinfo, datetime, False))
+        return SimpleDate._from_parts(datetime, self.__tables[1].values[self.__formats[index]])
+
+    def __iter__(self):
+        for index in range(len(self)):
+            yield self[index]
+
+    def __select(self, indices):
+        '''
+        :param indices: The indices of the dates to include.
+        :return: A new array (sharing tables with this one).
+        '''
+        selected = self.__class__(tables=self.__tables)
+        for source, target in ((self.__times, selected.__times),
+                               (self.__zones, selected.__zones),
+                               (self.__formats, selected.__formats)):
+            target.extend(source[index] for index in indices)
+        return selected
+
+    def sort(self, reverse=False):
+        '''
+        Sort the dates (in place) by UTC time.  The sort is stable (unlike
+        sorting SimpleDate instances, which orders equal instants by `repr`).
+
+        :param reverse: Latest first?
+        '''
+        order = sorted(range(len(self)), key=self.__times.__getitem__, reverse=reverse)
+        ordered = self.__select(order)
+        self.__times, self.__zones, self.__formats = ordered.__times, ordered.__zones, ordered.__formats
+
+    def convert(self, tz=None, format=None, is_dst=False, country=None, tz_factory=None, unsafe=False, debug=False):
+        '''
+        As `SimpleDate.convert()`, for each date.
+
+        :return: A new array (sharing tables with this one).
+        '''
+        converted = self.__select(range(len(self)))
+        if isinstance(tz, dt.tzinfo) and country is None and len(self):
+            # the search would give the same timezone for every date
+            converted.__zones = array('i', [self.__zone_id(tz, self.__datetime(0)[0].astimezone(tz))]) * len(self)
+        elif tz is not None or country is not None:
+            # otherwise, search for each date (the factory caches results)
+            tz_factory = get_default('DEFAULT_TZ_FACTORY', tz_factory)
+            zones = () if tz is None else (tz,)
+            for index in range(len(self)):
+                datetime, _ = self.__datetime(index)
+                tzinfo = tz_factory.search(*zones, datetime=datetime, is_dst=is_dst, country=country, unsafe=unsafe, debug=debug)
+                converted.__zones[index] = self.__zone_id(tzinfo, datetime.astimezone(tzinfo))
+        if format is not None:
+            format = strip(auto_invert(single_format(format)))
+            format_id = self.__tables[1].id(format, format)
+            converted.__formats = array('i', [format_id]) * len(self)
+        return converted
+
+    def strftime(self, format=None):
+        '''
+        :param format: The format to use (`None` for each date's own format).
+        :return: A list of formatted dates.
+        '''
+        formats = self.__tables[1].values
+        format = auto_invert(format)
+        return [self.__datetime(index)[0].strftime(formats[self.__formats[index]] if format is None else format)
+                for index in range(len(self))]
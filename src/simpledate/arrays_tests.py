@@ -0,0 +1,66 @@
+
+from unittest import TestCase
+from pytz import utc, timezone
+from simpledate import SimpleDate, SingleInstantTzError
+from simpledate.arrays import SimpleDateArray, Table
+
+
+class SimpleDateArrayTest(TestCase):
+
+    DATES = ['2013-06-08 12:34:56 EDT', '2013-01-08T00:00:00Z', 'Sat, 08 Jun 2013 12:34:56 -0400',
+             '2012-06-08 12:34:56 America/New_York', '2013-06-08T12:34:56.789+05:30', '2011-06-13 02:30 CLT']
+
+    def test_access(self):
+        dates = list(SimpleDate.from_strings(self.DATES, unsafe=True))
+        array = SimpleDateArray.from_strings(self.DATES, unsafe=True)
+        assert len(array) == len(dates)
+        for date, item in zip(dates, array):
+            assert item == date, (item, date)
+            assert str(item) == str(date), (item, date)
+        assert array[-1] == dates[-1]
+        assert list(array[1:4]) == dates[1:4]
+        assert array.strftime() == [str(date) for date in dates]
+        assert array.strftime('Y-m-d') == [date.strftime('Y-m-d') for date in dates]
+
+    def test_interval(self):
+        array = SimpleDateArray.from_strings(['2013-06-08 12:34:56 EDT'])
+        # the timezone (an IntervalTz) is valid only until the autumn
+        with self.assertRaises(SingleInstantTzError):
+            array[0].datetime.tzinfo.utcoffset(array[0].datetime.replace(month=1))
+
+    def test_open_interval(self):
+        # IST has no later transition, so the IntervalTz has no end
+        date = SimpleDate('2013-06-08 12:34 IST', unsafe=True)
+        assert date.datetime.tzinfo.end is None, date.datetime.tzinfo
+        array = SimpleDateArray([date])
+        assert array[0] == date, (array[0], date)
+        assert array.strftime() == [str(date)], array.strftime()
+
+    def test_many_zones(self):
+        # more ids than fit in int16
+        zones = Table()
+        for i in range(40000):
+            zones.id(i, None)
+        array = SimpleDateArray(SimpleDate.from_strings(self.DATES, unsafe=True), tables=(zones, Table()))
+        assert array.strftime() == [str(date) for date in SimpleDate.from_strings(self.DATES, unsafe=True)]
+
+    def test_sort(self):
+        dates = list(SimpleDate.from_strings(self.DATES, unsafe=True))
+        array = SimpleDateArray(dates)
+        array.sort()
+        assert [date.datetime for date in array] == sorted(date.datetime for date in dates), list(array)
+        assert list(array.times) == sorted(array.times)
+        array.sort(reverse=True)
+        assert [date.datetime for date in array] == sorted((date.datetime for date in dates), reverse=True)
+        # equal instants keep their order
+        assert array[0:2].strftime() == ['2013-06-08 12:34:56 EDT', 'Sat,08 Jun 2013 12:34:56 -0400'], array[0:2].strftime()
+
+    def test_convert(self):
+        dates = list(SimpleDate.from_strings(self.DATES, unsafe=True))
+        array = SimpleDateArray(dates)
+        for kargs in dict(tz=utc), dict(tz='America/New_York'), dict(tz='EST', unsafe=True), \
+                     dict(tz=timezone('Asia/Tokyo'), format='Y-m-d H:M Z'):
+            converted = array.convert(**kargs)
+            assert list(converted) == [date.convert(**kargs) for date in dates], kargs
+            assert [str(date) for date in converted] == [str(date.convert(**kargs)) for date in dates], kargs
+        assert list(array) == dates
@@ -0,0 +1,207 @@
+
+from collections import OrderedDict
+import datetime as dt
+import json
+from platform import python_version
+from re import purge
+from subprocess import check_output
+import sys
+from timeit import Timer
+import pytz
+from simpledate import SimpleDate, PyTzFactory, DEFAULT_FORMATS, best_guess_utc
+from simpledate.fmt import strptime, to_regexp, _to_regexp, auto_invert
+
+
+# Benchmarks for the main paths through the library (parsing, timezone
+# search, conversion and formatting), each timed separately so that a
+# slowdown can be traced to its source.  Results are saved as JSON and can
+# be compared with an earlier run (see __main__.py for the command line).
+
+# (c) 2013 Andrew Cooke (andrew@acooke.org)
+# Released into the public domain for any use, but with absolutely no warranty.
+
+
+# a sample date for each of DEFAULT_FORMATS (in order), with a name.
+SAMPLES = (('iso_8601', '2013-06-08 12:34:56.789 -04:00'),
+           ('rfc_2822', 'Sat, 08 Jun 2013 12:34:56 EDT'),
+           ('asn_1', 'Jun 08 12:34:56 2013 UTC'),
+           ('asn_1_long', '20130608123456Z'),
+           ('asn_1_short', '130608123456Z'))
+
+# the groups of benchmarks (see `group()`), in order.
+GROUPS = []
+
+# the version of the JSON file written by `save()`.
+FORMAT = 1
+
+
+def group(function):
+    '''
+    Register a group of benchmarks.
+
+    :param function: A function that generates (name, callable) pairs.
+                     The callable takes no arguments and is timed.
+    :return: The function.
+    '''
+    GROUPS.append(function)
+    return function
+
+
+@group
+def fmt_strptime():
+    for (name, date), format in zip(SAMPLES, DEFAULT_FORMATS):
+        format = auto_invert(format)
+        yield 'fmt.strptime/' + name, lambda date=date, format=format: strptime(date, format)
+
+
+@group
+def fmt_to_regexp():
+    for (name, _), format in zip(SAMPLES, DEFAULT_FORMATS):
+        format = auto_invert(format)
+        def cold(format=format):
+            purge()  # re also caches compiled expressions
+            _to_regexp(format)
+        yield 'fmt.to_regexp.cold/' + name, cold
+        yield 'fmt.to_regexp.warm/' + name, lambda format=format: to_regexp(format)
+
+
+@group
+def search():
+    # the results cache is disabled, except for the last case.
+    factory, cached = PyTzFactory(cache_size=0), PyTzFactory()
+    datetime = dt.datetime(2013, 6, 8, 12, 34, 56)
+    yield 'search/name', lambda: factory.search('America/New_York', datetime=datetime)
+    yield 'search/abbreviation', lambda: factory.search('EDT', datetime=datetime, unsafe=True)
+    yield 'search/offset', lambda: factory.search(-240, datetime=datetime)
+    yield 'search/country', lambda: factory.search('CLT', datetime=datetime, country='CL')
+    yield 'search/cached', lambda: cached.search('EDT', datetime=datetime, unsafe=True)
+
+
+@group
+def construct():
+    tz = 'UTC'
+    datetime = dt.datetime(2013, 6, 8, 12, 34, 56, tzinfo=pytz.utc)
+    simple = SimpleDate(datetime)
+    for name, date in SAMPLES:
+        yield 'SimpleDate/string/' + name, lambda date=date: SimpleDate(date, unsafe=True)
+    yield 'SimpleDate/fields', lambda: SimpleDate(2013, 6, 8, 12, 34, 56, tz=tz)
+    yield 'SimpleDate/datetime', lambda: SimpleDate(datetime)
+    yield 'SimpleDate/date', lambda: SimpleDate(datetime.date(), tz=tz)
+    yield 'SimpleDate/time', lambda: SimpleDate(dt.time(12, 34, 56), tz=tz)
+    yield 'SimpleDate/ordinal', lambda: SimpleDate(ordinal=datetime.toordinal(), tz=tz)
+    yield 'SimpleDate/timestamp', lambda: SimpleDate(1370694896, tz=tz)
+    yield 'SimpleDate/simple', lambda: SimpleDate(simple)
+
+
+@group
+def convert():
+    date, day = SimpleDate('2013-06-08 12:34:56 EDT', unsafe=True), dt.timedelta(days=1)
+    yield 'convert/utc', lambda: date.convert(pytz.utc)
+    yield 'convert/name', lambda: date.convert('Europe/London')
+    yield 'convert/country', lambda: date.convert(country='GB')
+    yield 'convert/format', lambda: date.convert(format='%Y-%m-%d')
+    yield 'add', lambda: date + day
+    yield 'str', lambda: str(date)
+
+
+@group
+def guess():
+    for name, date in SAMPLES[:3]:  # Z is not accepted
+        yield 'best_guess_utc/' + name, lambda date=date: best_guess_utc(date)
+
+
+def import_time():
+    '''
+    :return: The time (seconds) to import the library in a new interpreter.
+    '''
+    code = 'from time import perf_counter as t; s = t(); import simpledate; print(t() - s)'
+    return float(check_output([sys.executable, '-c', code]))
+
+
+def benchmarks(patterns=None):
+    '''
+    :param patterns: Substrings of the names to include (`None` for all).
+    :return: A sequence of (name, callable) pairs.
+    '''
+    for function in GROUPS:
+        for name, run in function():
+            if not patterns or any(pattern in name for pattern in patterns):
+                yield name, run
+
+
+def time(run, repeat=3, duration=0.1):
+    '''
+    :param run: The callable to time.
+    :param repeat: The number of times to repeat the measurement.
+    :param duration: The minimum time (seconds) for each measurement.
+    :return: The best time (seconds) for a single call.
+    '''
+    run()  # exclude any work done once (eg creating defaults)
+    timer, number = Timer(run), 1
+    while True:
+        elapsed = timer.timeit(number)
+        if elapsed >= duration:
+            break
+        number *= 10 if elapsed < duration / 10 else 2
+    return min([elapsed] + timer.repeat(repeat - 1, number)) / number
+
+
+def run_all(patterns=None, repeat=3, duration=0.1, log=None):
+    '''
+    Run the benchmarks.
+
+    :param patterns: Substrings of the names to include (`None` for all).
+    :param repeat: The number of times to repeat each measurement.
+    :param duration: The minimum time (seconds) for each measurement.
+    :param log: Called with the name and time of each result, if given.
+    :return: An ordered dict from name to time (seconds per call).
+    '''
+    results = OrderedDict()
+    named = list(benchmarks(patterns))
+    if not patterns or any(pattern in 'import' for pattern in patterns):
+        named.insert(0, ('import', None))
+    for name, run in named:
+        if run is None:
+            results[name] = min(import_time() for _ in range(max(repeat, 1)))
+        else:
+            results[name] = time(run, repeat=repeat, duration=duration)
+        if log:
+            log(name, results[name])
+    return results
+
+
+def save(results, path):
+    '''
+    :param results: The results from `run_all()`.
+    :param path: The file to write (JSON).
+    '''
+    with open(path, 'w') as output:
+        json.dump(OrderedDict([('format', FORMAT),
+                               ('python', python_version()),
+                               ('pytz', pytz.__version__),
+                               ('date', dt.datetime.utcnow().isoformat()),
+                               ('results', results)]), output, indent=2)
+
+
+def load(path):
+    '''
+    :param path: A file written by `save()`.
+    :return: The results (an ordered dict from name to time).
+    '''
+    with open(path) as input:
+        saved = json.load(input, object_pairs_hook=OrderedDict)
+    if saved.get('format') != FORMAT:
+        raise ValueError('Unexpected format in {0}'.format(path))
+    return saved['results']
+
+
+def compare(results, baseline):
+    '''
+    :param results: The results from `run_all()`.
+    :param baseline: Earlier results (eg from `load()`).
+    :return: A sequence of (name, time, baseline time, ratio) for the
+             benchmarks in both.
+    '''
+    for name, seconds in results.items():
+        if name in baseline:
+            yield name, seconds, baseline[name], seconds / baseline[name]
@@ -0,0 +1,46 @@
+
+from argparse import ArgumentParser
+import sys
+from simpledate.benchmarks import run_all, save, load, compare
+
+
+# Run the benchmarks from the command line:
+#
+#   python -m simpledate.benchmarks --output new.json --baseline old.json
+#
+# The exit status is 1 if any benchmark is slower than the baseline by
+# more than the threshold.
+
+# (c) 2013 Andrew Cooke (andrew@acooke.org)
+# Released into the public domain for any use, but with absolutely no warranty.
+
+
+def main(args=None):
+    parser = ArgumentParser(prog='python -m simpledate.benchmarks', description='Time the main paths through simpledate.')
+    parser.add_argument('patterns', nargs='*', help='run only benchmarks whose names contain one of these')
+    parser.add_argument('-o', '--output', help='save the results to this (JSON) file')
+    parser.add_argument('-b', '--baseline', help='compare with results saved earlier')
+    parser.add_argument('-r', '--repeat', type=int, default=3, help='repeat each measurement (default 3)')
+    parser.add_argument('-d', '--duration', type=float, default=0.1, help='minimum seconds per measurement (default 0.1)')
+    parser.add_argument('-t', '--threshold', type=float, default=1.2, help='ratio to baseline that is a slowdown (default 1.2)')
+    args = parser.parse_args(args)
+
+    baseline = load(args.baseline) if args.baseline else {}
+    def log(name, seconds):
+        if name in baseline:
+            print('{0:40s} {1:12.3f}us {2:12.3f}us {3:6.2f}x'.format(name, seconds * 1e6, baseline[name] * 1e6, seconds / baseline[name]))
+        else:
+            print('{0:40s} {1:12.3f}us'.format(name, seconds * 1e6))
+    results = run_all(args.patterns, repeat=args.repeat, duration=args.duration, log=log)
+
+    if args.output:
+        save(results, args.output)
+    slower = [name for name, _, _, ratio in compare(results, baseline) if ratio > args.threshold]
+    if slower:
+        print('Slower than baseline: {0}'.format(', '.join(slower)))
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
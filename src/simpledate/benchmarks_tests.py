@@ -0,0 +1,30 @@
+
+from os.path import join
+from tempfile import TemporaryDirectory
+from unittest import TestCase
+from simpledate.benchmarks import run_all, save, load, compare, benchmarks
+from simpledate.benchmarks.__main__ import main
+
+
+class BenchmarksTest(TestCase):
+
+    def test_names(self):
+        names = [name for name, _ in benchmarks()]
+        assert len(names) == len(set(names)), names
+        for prefix in ('fmt.strptime/', 'fmt.to_regexp.cold/', 'search/', 'SimpleDate/', 'convert/', 'best_guess_utc/'):
+            assert any(name.startswith(prefix) for name in names), prefix
+        # every benchmark can run
+        for name, run in benchmarks():
+            run()
+
+    def test_save(self):
+        results = run_all(['strptime/iso'], repeat=1, duration=0.001)
+        assert list(results) == ['fmt.strptime/iso_8601'], results
+        with TemporaryDirectory() as directory:
+            path = join(directory, 'results.json')
+            save(results, path)
+            assert load(path) == results
+            assert main(['strptime/iso', '-r', '1', '-d', '0.001', '-b', path, '-t', '1000']) == 0
+            assert main(['strptime/iso', '-r', '1', '-d', '0.001', '-b', path, '-t', '0']) == 1
+        (name, seconds, baseline, ratio), = compare(results, {'fmt.strptime/iso_8601': results['fmt.strptime/iso_8601'] / 2})
+        assert ratio == 2, ratio
@@ -1,16 +1,15 @@
 
-from functools import lru_cache
-from simpledate.utils import HashableDict
+from simpledate.utils import HashableDict, PublishedCache
+from simpledate.stats import MATCH, EXTRACT, RECONSTRUCT
 
 try:
     from _thread import allocate_lock as _thread_allocate_lock
 except ImportError:
     from _dummy_thread import allocate_lock as _thread_allocate_lock
 from _strptime import LocaleTime, _calc_julian_from_U_or_W
-from collections import defaultdict
 from datetime import date
 import time
-from re import sub, escape, compile, IGNORECASE
+from re import sub, escape, compile, IGNORECASE, DOTALL
 
 
 # extend the usual date parsing with:
@@ -74,10 +73,10 @@ def tokenizer(fmt):
         i = j
 
 
-def _to_regexp(fmt, to_regex=None, to_write=None):
+def _to_regex(fmt, to_regex=None, to_write=None):
     '''
-    Given a format, construct the equivalent regexp (and compile it) and
-    the information needed to reconstruct a matching template after use.
+    Given a format, construct the equivalent regexp (as a string) and the
+    information needed to reconstruct a matching template after use.
 
     The reconstruction works by embedding empty matches in the regexp that
     record which parts of the expression were matched.  For example, a
@@ -108,7 +107,7 @@ def _to_regexp(fmt, to_regex=None, to_write=None):
     # examples that might help clarify how it works.
     count = 0  # latest group
     stack = [0]  # nested groups
-    rebuild = defaultdict(lambda: '')  # group substitutions
+    rebuild = Rebuild()  # group substitutions
 
     regex = ''
     tokens = tokenizer(fmt)
@@ -142,33 +141,386 @@ def _to_regexp(fmt, to_regex=None, to_write=None):
         pass
     if stack != [0]:
         raise ValueError('Unmatched %(')
+    return regex, rebuild
+
 
+def _to_regexp(fmt, to_regex=None, to_write=None):
+    '''
+    As `_to_regex`, but also compile the regexp.
+    '''
+    regex, rebuild = _to_regex(fmt, to_regex, to_write)
     return regex, rebuild, compile(regex, IGNORECASE)
 
 
-TAG = compile(r'(?:^|[^%])%(G\d+)%')
+def _to_regexp_extractor(fmt, to_regex=None, to_write=None):
+    '''
+    As `_to_regexp`, but also create an `Extractor` for the matched values.
+
+    :return: The `_to_regexp()` results, and the same with the `Extractor`
+             appended.
+    '''
+    regexp = _to_regexp(fmt, to_regex, to_write)
+    return regexp, regexp + (Extractor(regexp[2].groupindex),)
+
+
+# a reference to a group, a directive (including %%), or literal text.
+PLAN_TOKEN = compile(r'%(G\d+)%|%.?|[^%]+', DOTALL)
+
+
+class Rebuild(dict):
+    '''
+    The templates described above, keyed by group name.
+
+    The result of a reconstruction depends only on which groups matched, so
+    the templates are parsed once (into literal text and references to other
+    groups) and results are memoised by the set of matched groups.
+    '''
+
+    def __init__(self, *args, **kargs):
+        super().__init__(*args, **kargs)
+        self.__plan = None
+        self.__results = {}
+
+    def __missing__(self, key):
+        return ''
+
+    def __compile(self):
+        plan = {}
+        for name, template in self.items():
+            plan[name] = tuple((match.group(1),) if match.group(1) else match.group(0)
+                               for match in PLAN_TOKEN.finditer(template))
+        self.__groups = tuple(name for name in plan if name != 'G0')
+        self.__plan = plan
+
+    def __expand(self, name, matched):
+        return ''.join(part if isinstance(part, str) else
+                       (self.__expand(part[0], matched) if part[0] in matched else '')
+                       for part in self.__plan.get(name, ()))
+
+    def reconstruct(self, found_dict):
+        '''
+        :param found_dict: The groups from a match.
+        :return: The write template for that match.
+        '''
+        if self.__plan is None:
+            self.__compile()
+        return self.expand(frozenset(name for name in self.__groups if found_dict.get(name) is not None))
+
+    def expand(self, matched):
+        '''
+        :param matched: The names of the groups that matched.
+        :return: The write template for that match.
+        '''
+        try:
+            return self.__results[matched]
+        except KeyError:
+            if self.__plan is None:
+                self.__compile()
+            result = sub(r'\\(.)', r'\1', self.__expand('G0', matched))
+            self.__results[matched] = result
+            return result
+
 
 def reconstruct(rebuild, found_dict):
     '''
     Implement the reconstruction described above, using the rebuild dictionary
     and the group information from a particular match.
     '''
-    fmt = rebuild['G0']
-    while True:
-        match = TAG.search(fmt)
-        if not match:
-            return sub(r'\\(.)', r'\1', fmt)
-        index = match.group(1)
-        if found_dict.get(index) is None:
-            replacement = ''
-        else:
-            replacement = rebuild[index]
-        fmt = fmt[:match.start(1)-1] + replacement + fmt[match.end(1)+1:]
+    if not isinstance(rebuild, Rebuild):
+        rebuild = Rebuild(rebuild)
+    return rebuild.reconstruct(found_dict)
 
 
 LOCALE_TIME = LocaleTime()
 
 
+def locale_tz(zone):
+    '''
+    The isdst flag for a timezone name, as in _strptime in standard Python.
+
+    :param zone: The timezone name (as matched by %Z).
+    :return: 0 or 1 if the name is known to the locale, otherwise -1.
+    '''
+    # Since -1 is default value only need to worry about setting tz if
+    # it can be something other than -1.
+    found_zone = zone.lower()
+    for value, tz_values in enumerate(LOCALE_TIME.timezone):
+        if found_zone in tz_values:
+            # Deal with bad locale setup where timezone names are the
+            # same and yet time.daylight is true; too ambiguous to
+            # be able to tell what timezone has daylight savings
+            if (time.tzname[0] == time.tzname[1] and
+               time.daylight and found_zone not in ("utc", "gmt")):
+                return -1
+            else:
+                return value
+    return -1
+
+
+# the main logic to construct a date/time from the matched data, lifted
+# from the python source, but table driven: each directive has a function
+# that sets values in a list (indexed by the constants below).  the only
+# other changes are to check that a group has actually matched (since now
+# some may be optional), the modified handling for y50, and uzing -ve
+# indices for z minutes.
+
+YEAR, MONTH, DAY, HOUR, MINUTE, SECOND, FRACTION, WEEKDAY, JULIAN, \
+    WEEK_OF_YEAR, WEEK_OF_YEAR_START, TZ, TZNAME, TZOFFSET, HOUR12, AMPM = range(16)
+
+# Default to -1 to signify that values not known; not critical to have
+# weekday and julian defaulted to -1 so as to signal need to calculate
+DEFAULT_VALUES = (None, 1, 1, 0, 0, 0, 0, -1, -1, -1, -1, -1, None, None, None, '')
+
+
+def _set(index, convert=int):
+    def setter(value, values):
+        values[index] = convert(value)
+    return setter
+
+def _set_y(value, values):
+    year = int(value)
+    # Open Group specification for strptime() states that a %y
+    #value in the range of [00, 68] is in the century 2000, while
+    #[69,99] is in the century 1900
+    if year <= 68:
+        year += 2000
+    else:
+        year += 1900
+    values[YEAR] = year
+
+def _set_y50(value, values):
+    year = int(value)
+    # ASN.1 / RFC 3852
+    if year < 50:
+        year += 2000
+    else:
+        year += 1900
+    values[YEAR] = year
+
+def _set_f(value, values):
+    # Pad to always return microseconds.
+    values[FRACTION] = int(value + "0" * (6 - len(value)))
+
+def _set_w(value, values):
+    weekday = int(value)
+    if weekday == 0:
+        weekday = 6
+    else:
+        weekday -= 1
+    values[WEEKDAY] = weekday
+
+def _set_week(start):
+    # U starts week on Sunday (6), W on Monday (0).
+    def setter(value, values):
+        values[WEEK_OF_YEAR] = int(value)
+        values[WEEK_OF_YEAR_START] = start
+    return setter
+
+def _set_z(value, values):
+    tzoffset = int(value[1:3]) * 60 + int(value[-2:])
+    if value.startswith("-"):
+        tzoffset = -tzoffset
+    values[TZOFFSET] = tzoffset
+
+def _set_Z(value, values):
+    values[TZ] = locale_tz(value)
+    values[TZNAME] = value
+
+# Directives not handled here:
+#   c, x, X
+#      handled by making out of other directives
+FIELDS = {
+    'y': _set_y,
+    'y50': _set_y50,
+    'Y': _set(YEAR),
+    'm': _set(MONTH),
+    'B': _set(MONTH, lambda value: LOCALE_TIME.f_month.index(value.lower())),
+    'b': _set(MONTH, lambda value: LOCALE_TIME.a_month.index(value.lower())),
+    'd': _set(DAY),
+    'H': _set(HOUR),
+    'I': _set(HOUR12),
+    'p': _set(AMPM, str.lower),
+    'M': _set(MINUTE),
+    'S': _set(SECOND),
+    'f': _set_f,
+    'A': _set(WEEKDAY, lambda value: LOCALE_TIME.f_weekday.index(value.lower())),
+    'a': _set(WEEKDAY, lambda value: LOCALE_TIME.a_weekday.index(value.lower())),
+    'w': _set_w,
+    'j': _set(JULIAN),
+    'U': _set_week(6),
+    'W': _set_week(0),
+    'z': _set_z,
+    'Z': _set_Z,
+}
+
+
+class TimeResult:
+    '''
+    The values read from a date.  Julian day and weekday are calculated
+    only when needed (the parser does not use them), so this is cheaper than
+    the tuple returned by `strptime()` (see `astuple()`).
+    '''
+
+    __slots__ = ('year', 'month', 'day', 'hour', 'minute', 'second', 'fraction',
+                 'tz', 'tzname', 'gmtoff', '_weekday', '_julian')
+
+    def __init__(self, year, month, day, hour, minute, second, fraction,
+                 tz=-1, tzname=None, gmtoff=None, weekday=-1, julian=-1):
+        self.year, self.month, self.day = year, month, day
+        self.hour, self.minute, self.second, self.fraction = hour, minute, second, fraction
+        self.tz, self.tzname, self.gmtoff = tz, tzname, gmtoff
+        self._weekday, self._julian = weekday, julian
+
+    @property
+    def julian(self):
+        if self._julian == -1:
+            # Need to add 1 to result since first day of the year is 1, not 0.
+            self._julian = date(self.year, self.month, self.day).toordinal() - \
+                           date(self.year, 1, 1).toordinal() + 1
+        return self._julian
+
+    @property
+    def weekday(self):
+        if self._weekday == -1:
+            self._weekday = date(self.year, self.month, self.day).weekday()
+        return self._weekday
+
+    def astuple(self):
+        '''
+        :return: The time tuple and fraction, as for `to_time_tuple()`.
+        '''
+        return (self.year, self.month, self.day,
+                self.hour, self.minute, self.second,
+                self.weekday, self.julian, self.tz, self.tzname, self.gmtoff), self.fraction
+
+    def __repr__(self):
+        return 'TimeResult({0})'.format(', '.join('{0}={1!r}'.format(name, getattr(self, name))
+                                                   for name in self.__slots__))
+
+
+def _to_result(values):
+    '''
+    Construct the result from the values set by FIELDS.
+
+    :param values: The values (see DEFAULT_VALUES).
+    :return: A `TimeResult`.
+    '''
+    year, month, day, hour, minute, second, fraction, weekday, julian, \
+        week_of_year, week_of_year_start, tz, tzname, tzoffset, hour12, ampm = values
+    if hour12 is not None:
+        hour = hour12
+        # If there was no AM/PM indicator, we'll treat this like AM
+        if ampm in ('', LOCALE_TIME.am_pm[0]):
+            # We're in AM so the hour is correct unless we're
+            # looking at 12 midnight.
+            # 12 midnight == 12 AM == hour 0
+            if hour == 12:
+                hour = 0
+        elif ampm == LOCALE_TIME.am_pm[1]:
+            # We're in PM so we need to add 12 to the hour unless
+            # we're looking at 12 noon.
+            # 12 noon == 12 PM == hour 12
+            if hour != 12:
+                hour += 12
+    leap_year_fix = False
+    if year is None and month == 2 and day == 29:
+        year = 1904  # 1904 is first leap year of 20th century
+        leap_year_fix = True
+    elif year is None:
+        year = 1900
+    # If we know the week of the year and what day of that week, we can figure
+    # out the Julian day of the year.
+    if julian == -1 and week_of_year != -1 and weekday != -1:
+        week_starts_Mon = True if week_of_year_start == 0 else False
+        julian = _calc_julian_from_U_or_W(year, week_of_year, weekday,
+                                            week_starts_Mon)
+    # Cannot pre-calculate date() since can change in Julian
+    # calculation and thus could have different value for the day of the week
+    # calculation.
+    if julian != -1:
+        # Assume that if they bothered to include Julian day it will
+        # be accurate.
+        datetime_result = date.fromordinal((julian - 1) + date(year, 1, 1).toordinal())
+        year = datetime_result.year
+        month = datetime_result.month
+        day = datetime_result.day
+    # Add timezone info
+    if tzoffset is not None:
+        gmtoff = tzoffset * 60
+    else:
+        gmtoff = None
+
+    result = TimeResult(year, month, day, hour, minute, second, fraction,
+                        tz, tzname, gmtoff, weekday, julian)
+    if leap_year_fix:
+        # the caller didn't supply a year but asked for Feb 29th. We couldn't
+        # use the default of 1900 for computations. We set it back to ensure
+        # that February 29th is smaller than March 1st.
+        result.julian, result.weekday  # calculate now, with 1904
+        result.year = 1900
+    return result
+
+
+def to_time_tuple(found_dict):
+    '''Closely based on _strptime in standard Python.'''
+    values = list(DEFAULT_VALUES)
+    for group_key, value in found_dict.items():
+        if value is not None and group_key in FIELDS:
+            FIELDS[group_key](value, values)
+    return _to_result(values).astuple()
+
+
+# a marker group (see _to_regexp).
+MARKER = compile(r'G\d+$')
+
+class Extractor:
+    '''
+    Read the time tuple (and the matched marker groups) directly from a
+    match, using the group indices known when the regexp was compiled.
+    This avoids building a dictionary and skips the marker groups.
+    '''
+
+    def __init__(self, groupindex, prefix=''):
+        '''
+        :param groupindex: The group names and indices from the regexp.
+        :param prefix: A prefix on the names to use (others are ignored, as
+                       are names that are not directives).
+        :return: A callable that takes a match and returns a `TimeResult`.
+        '''
+        fields, markers = [], []
+        for name, index in sorted(groupindex.items(), key=lambda item: item[1]):
+            if name.startswith(prefix):
+                name = name[len(prefix):]
+                if MARKER.match(name):
+                    markers.append((index, name))
+                elif name in FIELDS:
+                    fields.append((index, FIELDS[name]))
+        self.__fields = tuple(fields)
+        self.__markers = tuple(markers)
+
+    def __call__(self, match):
+        '''
+        :param match: The match for the regexp.
+        :return: A `TimeResult`.
+        '''
+        values = list(DEFAULT_VALUES)
+        group = match.group
+        for index, setter in self.__fields:
+            value = group(index)
+            if value is not None:
+                setter(value, values)
+        return _to_result(values)
+
+    def markers(self, match):
+        '''
+        :param match: The match for the regexp.
+        :return: The names of the marker groups that matched (for
+                 `Rebuild.expand()`).
+        '''
+        group = match.group
+        return frozenset(name for index, name in self.__markers if group(index) is not None)
+
+
 def seq_to_re(to_convert, directive):
     '''Copied from strptime method'''
     to_convert = sorted(to_convert, key=len, reverse=True)
@@ -217,9 +569,9 @@ BASE_TO_REGEX = HashableDict({
 
 PYTHON_TO_REGEX= HashableDict(BASE_TO_REGEX)
 PYTHON_TO_REGEX.update({
-    '%c': _to_regexp(LOCALE_TIME.LC_date_time, BASE_TO_REGEX, {})[0],
-    '%x': _to_regexp(LOCALE_TIME.LC_date, BASE_TO_REGEX, {})[0],
-    '%X': _to_regexp(LOCALE_TIME.LC_time, BASE_TO_REGEX, {})[0],
+    '%c': _to_regex(LOCALE_TIME.LC_date_time, BASE_TO_REGEX, {})[0],
+    '%x': _to_regex(LOCALE_TIME.LC_date, BASE_TO_REGEX, {})[0],
+    '%X': _to_regex(LOCALE_TIME.LC_time, BASE_TO_REGEX, {})[0],
 })
 
 
@@ -279,176 +631,87 @@ DEFAULT_TO_WRITE = dict(map(auto_convert, FLEXIBLE_REGEX.keys()))
 DEFAULT_TO_WRITE.update(HIDE_CHOICES)
 
 
-# thread-safe caching
+# thread-safe caching (hits need no lock, see PublishedCache).
 
 CACHE_MAX_SIZE = 100
 _CACHE_LOCK = _thread_allocate_lock()
-_CACHED_REGEXP = lru_cache(maxsize=CACHE_MAX_SIZE)(_to_regexp)
+_CACHED_REGEXP = PublishedCache(_to_regexp_extractor, CACHE_MAX_SIZE, _CACHE_LOCK)
 
 def to_regexp(fmt, substitutions=None):
-    with _CACHE_LOCK:
-        return _CACHED_REGEXP(fmt, substitutions)
+    return _CACHED_REGEXP(fmt, substitutions)[0]
 
+def _to_regexp_full(fmt, substitutions=None):
+    '''
+    As `to_regexp()`, but with the `Extractor` for the regexp appended.
+    '''
+    return _CACHED_REGEXP(fmt, substitutions)[1]
 
-# the main logic to construct a date/time from the matched data, lifted
-# verbatim from the python source.  the only changes are to check that
-# a group has actually matched (since now some may be optional), the
-# modified handling for y50, and uzing -ve indices for z minutes.
 
-def to_time_tuple(found_dict):
-    '''Closely based on _strptime in standard Python.'''
-    year = None
-    month = day = 1
-    hour = minute = second = fraction = 0
-    tz = -1
-    tzoffset = None
-    # Default to -1 to signify that values not known; not critical to have
-    week_of_year = -1
-    week_of_year_start = -1
-    # weekday and julian defaulted to -1 so as to signal need to calculate
-    weekday = julian = -1
-    for group_key in (key for key in found_dict.keys() if found_dict[key] is not None):
-        # Directives not explicitly handled below:
-        #   c, x, X
-        #      handled by making out of other directives
-        #   U, W
-        #      worthless without day of the week
-        if group_key == 'y':
-            year = int(found_dict['y'])
-            # Open Group specification for strptime() states that a %y
-            #value in the range of [00, 68] is in the century 2000, while
-            #[69,99] is in the century 1900
-            if year <= 68:
-                year += 2000
-            else:
-                year += 1900
-        elif group_key == 'y50':
-            year = int(found_dict['y50'])
-            # ASN.1 / RFC 3852
-            if year < 50:
-                year += 2000
-            else:
-                year += 1900
-        elif group_key == 'Y':
-            year = int(found_dict['Y'])
-        elif group_key == 'm':
-            month = int(found_dict['m'])
-        elif group_key == 'B':
-            month = LOCALE_TIME.f_month.index(found_dict['B'].lower())
-        elif group_key == 'b':
-            month = LOCALE_TIME.a_month.index(found_dict['b'].lower())
-        elif group_key == 'd':
-            day = int(found_dict['d'])
-        elif group_key == 'H':
-            hour = int(found_dict['H'])
-        elif group_key == 'I':
-            hour = int(found_dict['I'])
-            ampm = found_dict.get('p', '').lower()
-            # If there was no AM/PM indicator, we'll treat this like AM
-            if ampm in ('', LOCALE_TIME.am_pm[0]):
-                # We're in AM so the hour is correct unless we're
-                # looking at 12 midnight.
-                # 12 midnight == 12 AM == hour 0
-                if hour == 12:
-                    hour = 0
-            elif ampm == LOCALE_TIME.am_pm[1]:
-                # We're in PM so we need to add 12 to the hour unless
-                # we're looking at 12 noon.
-                # 12 noon == 12 PM == hour 12
-                if hour != 12:
-                    hour += 12
-        elif group_key == 'M':
-            minute = int(found_dict['M'])
-        elif group_key == 'S':
-            second = int(found_dict['S'])
-        elif group_key == 'f':
-            s = found_dict['f']
-            # Pad to always return microseconds.
-            s += "0" * (6 - len(s))
-            fraction = int(s)
-        elif group_key == 'A':
-            weekday = LOCALE_TIME.f_weekday.index(found_dict['A'].lower())
-        elif group_key == 'a':
-            weekday = LOCALE_TIME.a_weekday.index(found_dict['a'].lower())
-        elif group_key == 'w':
-            weekday = int(found_dict['w'])
-            if weekday == 0:
-                weekday = 6
-            else:
-                weekday -= 1
-        elif group_key == 'j':
-            julian = int(found_dict['j'])
-        elif group_key in ('U', 'W'):
-            week_of_year = int(found_dict[group_key])
-            if group_key == 'U':
-                # U starts week on Sunday.
-                week_of_year_start = 6
-            else:
-                # W starts week on Monday.
-                week_of_year_start = 0
-        elif group_key == 'z':
-            z = found_dict['z']
-            tzoffset = int(z[1:3]) * 60 + int(z[-2:])
-            if z.startswith("-"):
-                tzoffset = -tzoffset
-        elif group_key == 'Z':
-            # Since -1 is default value only need to worry about setting tz if
-            # it can be something other than -1.
-            found_zone = found_dict['Z'].lower()
-            for value, tz_values in enumerate(LOCALE_TIME.timezone):
-                if found_zone in tz_values:
-                    # Deal with bad locale setup where timezone names are the
-                    # same and yet time.daylight is true; too ambiguous to
-                    # be able to tell what timezone has daylight savings
-                    if (time.tzname[0] == time.tzname[1] and
-                       time.daylight and found_zone not in ("utc", "gmt")):
-                        break
-                    else:
-                        tz = value
-                        break
-    leap_year_fix = False
-    if year is None and month == 2 and day == 29:
-        year = 1904  # 1904 is first leap year of 20th century
-        leap_year_fix = True
-    elif year is None:
-        year = 1900
-    # If we know the week of the year and what day of that week, we can figure
-    # out the Julian day of the year.
-    if julian == -1 and week_of_year != -1 and weekday != -1:
-        week_starts_Mon = True if week_of_year_start == 0 else False
-        julian = _calc_julian_from_U_or_W(year, week_of_year, weekday,
-                                            week_starts_Mon)
-    # Cannot pre-calculate date() since can change in Julian
-    # calculation and thus could have different value for the day of the week
-    # calculation.
-    if julian == -1:
-        # Need to add 1 to result since first day of the year is 1, not 0.
-        julian = date(year, month, day).toordinal() - \
-                  date(year, 1, 1).toordinal() + 1
-    else:  # Assume that if they bothered to include Julian day it will
-           # be accurate.
-        datetime_result = date.fromordinal((julian - 1) + date(year, 1, 1).toordinal())
-        year = datetime_result.year
-        month = datetime_result.month
-        day = datetime_result.day
-    if weekday == -1:
-        weekday = date(year, month, day).weekday()
-    # Add timezone info
-    tzname = found_dict.get('Z')
-    if tzoffset is not None:
-        gmtoff = tzoffset * 60
-    else:
-        gmtoff = None
+# a group name (taking care to skip escaped parens).
+GROUP_NAME = compile(r'((?:^|[^\\])(?:\\\\)*)\(\?P<')
 
-    if leap_year_fix:
-        # the caller didn't supply a year but asked for Feb 29th. We couldn't
-        # use the default of 1900 for computations. We set it back to ensure
-        # that February 29th is smaller than March 1st.
-        year = 1900
+def _to_combined_regexp(formats):
+    '''
+    Combine the regexps for several formats into a single alternation, so
+    that one match finds the first format (in order) that matches.
+
+    Each format's regexp is wrapped in a group named F<n> (where n is the
+    index of the format) and all the groups within it are prefixed with
+    F<n>_ so that names do not clash.
+
+    :param formats: A tuple of formats.
+    :return: A tuple of (rebuild, extractor) for each format, and the
+             compiled regexp.
+    '''
+    rebuilds, regexps = [], []
+    for index, fmt in enumerate(formats):
+        regexp, rebuild, _ = to_regexp(fmt)
+        prefix = 'F%d_' % index
+        regexps.append('(?P<F%d>%s)' % (index, GROUP_NAME.sub(r'\1(?P<' + prefix, regexp)))
+        rebuilds.append(rebuild)
+    combined = compile('|'.join(regexps), IGNORECASE)
+    return tuple((rebuild, Extractor(combined.groupindex, 'F%d_' % index))
+                 for index, rebuild in enumerate(rebuilds)), combined
+
+_COMBINED_CACHE_LOCK = _thread_allocate_lock()
+_CACHED_COMBINED_REGEXP = PublishedCache(_to_combined_regexp, CACHE_MAX_SIZE, _COMBINED_CACHE_LOCK)
+
+
+def _to_permuted_regexp(formats):
+    '''
+    The combined regexp is compiled once for a set of formats (in sorted
+    order), whatever the order in which they are tried, so that promoting
+    a format does not compile a new alternation.  This maps the branches
+    of that regexp back to the given order.
+
+    :param formats: A tuple of formats, in the order they are tried.
+    :return: A tuple of (rebuild, extractor) for each branch, the compiled
+             regexp, and the index in `formats` of each branch.
+    '''
+    ordered = tuple(sorted(set(formats)))
+    branches, combined = _CACHED_COMBINED_REGEXP(ordered)
+    return branches, combined, tuple(formats.index(fmt) for fmt in ordered)
+
+_PERMUTED_CACHE_LOCK = _thread_allocate_lock()
+_CACHED_PERMUTED_REGEXP = PublishedCache(_to_permuted_regexp, CACHE_MAX_SIZE, _PERMUTED_CACHE_LOCK)
 
-    return (year, month, day,
-            hour, minute, second,
-            weekday, julian, tz, tzname, gmtoff), fraction
+def to_combined_regexp(formats):
+    return _CACHED_PERMUTED_REGEXP(tuple(formats))
+
+
+def set_cache_max_size(size):
+    '''
+    Change the number of compiled regexps that are kept (the default is
+    CACHE_MAX_SIZE).  Excess entries are discarded on the next miss.
+
+    :param size: The number of (format, substitutions) pairs, and of
+                 combinations of formats, to keep.
+    '''
+    global CACHE_MAX_SIZE
+    CACHE_MAX_SIZE = size
+    _CACHED_REGEXP.maxsize = size
+    _CACHED_COMBINED_REGEXP.maxsize = size
+    _CACHED_PERMUTED_REGEXP.maxsize = size
 
 
 def strptime(data_string, format="%a %b %d %H:%M:%S %Y"):
@@ -456,14 +719,30 @@ def strptime(data_string, format="%a %b %d %H:%M:%S %Y"):
     Parse the input and return date/time tuple, fractional seconds, and
     a format that matched the input.
     '''
+    result, write_format = strptime_lazy(data_string, format)
+    date_time, fraction = result.astuple()
+    return date_time, fraction, write_format
+
+
+def strptime_lazy(data_string, format, stats=None):
+    '''
+    As `strptime()`, but return a `TimeResult` and the write format.  The
+    date is not checked (that happens when a datetime is constructed, or
+    julian day or weekday is requested).
+
+    `stats` (a `simpledate.stats.Stats` instance), if given, records the
+    stages.
+    '''
 
     for index, arg in enumerate([data_string, format]):
         if not isinstance(arg, str):
             msg = "strptime() argument {} must be str, not {}"
             raise TypeError(msg.format(index, type(arg)))
 
-    _, rebuild, format_regex = to_regexp(format)
+    _, rebuild, format_regex, extract = _to_regexp_full(format)
+    start = stats.start() if stats else 0
     found = format_regex.match(data_string)
+    if stats: stats.stop(MATCH, start)
     if not found:
         raise ValueError("time data %r does not match format %r" %
                          (data_string, format))
@@ -471,10 +750,195 @@ def strptime(data_string, format="%a %b %d %H:%M:%S %Y"):
         raise ValueError("unconverted data remains: %s" %
                           data_string[found.end():])
 
-    date_time, fraction = to_time_tuple(found.groupdict())
-    write_format = reconstruct(rebuild, found.groupdict())
+    return _extract(found, rebuild, extract, stats)
 
-    return date_time, fraction, write_format
+
+def _extract(found, rebuild, extract, stats):
+    '''
+    :param found: The match.
+    :param rebuild: The `Rebuild` for the format.
+    :param extract: The `Extractor` for the regexp.
+    :param stats: A `Stats` instance, or `None`.
+    :return: The `TimeResult` and write format.
+    '''
+    if stats:
+        start = stats.start()
+        result = extract(found)
+        stats.stop(EXTRACT, start)
+        start = stats.start()
+        write_format = rebuild.expand(extract.markers(found))
+        stats.stop(RECONSTRUCT, start)
+        return result, write_format
+    else:
+        return extract(found), rebuild.expand(extract.markers(found))
+
+
+def strptime_first(data_string, formats, stats=None):
+    '''
+    Find the first of several formats whose regexp matches the input (in
+    the same way as calling `strptime_lazy()` with each in turn), using a
+    single (combined) regexp.
+
+    :param data_string: The input to parse.
+    :param formats: The formats to try, in order.
+    :param stats: A `simpledate.stats.Stats` instance to record the stages.
+    :return: The index of the first format that matches (or the number of
+             formats if none match) and, if the format matched the entire
+             input, the `strptime_lazy()` results (otherwise `None`).
+    '''
+    branches, combined, positions = to_combined_regexp(formats)
+    start = stats.start() if stats else 0
+    found = combined.match(data_string)
+    if found:
+        # the wrapping group for the format closes last
+        branch = int(found.lastgroup[1:])
+        index = positions[branch]
+        rebuild, extract = branches[branch]
+        # the branches are in sorted order, so a format that is tried
+        # earlier, but sorts later, may also match.
+        for earlier in range(index):
+            if formats[earlier] > formats[index]:
+                _, earlier_rebuild, regexp, earlier_extract = _to_regexp_full(formats[earlier])
+                earlier_found = regexp.match(data_string)
+                if earlier_found:
+                    index, found, rebuild, extract = earlier, earlier_found, earlier_rebuild, earlier_extract
+                    break
+    if stats: stats.stop(MATCH, start)
+    if not found:
+        return len(formats), None
+    if len(data_string) != found.end():
+        return index, None
+    try:
+        return index, _extract(found, rebuild, extract, stats)
+    except ValueError:  # eg day 366 of a normal year
+        return index, None
+
+
+def strptime_known(data_string, regexp, stats=None):
+    '''
+    As `strptime_lazy()`, but for a format that is expected to match (eg
+    one that matched an earlier date of the same shape), so that there is
+    no search and no exception.
+
+    :param data_string: The input to parse.
+    :param regexp: The result of `_to_regexp_full()` for the format.
+    :param stats: A `simpledate.stats.Stats` instance to record the stages.
+    :return: The `strptime_lazy()` results, or `None` if the format does
+             not match the entire input.
+    '''
+    _, rebuild, format_regex, extract = regexp
+    start = stats.start() if stats else 0
+    found = format_regex.match(data_string)
+    if stats: stats.stop(MATCH, start)
+    if not found or len(data_string) != found.end():
+        return None
+    try:
+        return _extract(found, rebuild, extract, stats)
+    except ValueError:
+        return None
+
+
+# a fast path for the most common ISO 8601 layouts, avoiding the regexp
+# and the general code in to_time_tuple.  anything unusual returns None so
+# that the caller can fall back to strptime.
+
+DIGITS = '0123456789'
+# the day of the year before the first of each month (not a leap year)
+DAYS_BEFORE_MONTH = (None, 0, 31, 59, 90, 120, 151, 181, 212, 243, 273, 304, 334)
+DAYS_IN_MONTH = (None, 31, 28, 31, 30, 31, 30, 31, 31, 30, 31, 30, 31)
+# the canonical zone for each zone layout (by length)
+ISO_ZONES = {0: '', 1: 'Z', 5: '+0000', 6: '+00:00'}
+_ISO_WRITE_FORMATS = {}
+
+
+def _iso_write_format(format, shape):
+    '''
+    The write format for a given layout.  Rather than duplicate the logic in
+    `reconstruct()` we parse a sample (once) with the general code.
+
+    :param format: The ISO 8601 read format.
+    :param shape: The layout, as a tuple of the separator, seconds, fraction
+                  and zone (each a fragment of a canonical date).
+    :return: The write format that `strptime()` returns for that layout.
+    '''
+    key = (format, shape)
+    try:
+        return _ISO_WRITE_FORMATS[key]
+    except KeyError:
+        write_format = strptime('2000-01-01' + shape[0] + '00:00' + ''.join(shape[1:]), format)[2]
+        _ISO_WRITE_FORMATS[key] = write_format
+        return write_format
+
+
+def strptime_iso(data_string, format):
+    '''
+    Parse the layouts `YYYY-MM-DD(T| )HH:MM(:SS(.ffffff)?)?(Z|+HH:MM|+HHMM)?`
+    using slicing and integer conversion only.
+
+    :param data_string: The input to parse.
+    :param format: The ISO 8601 read format that this replaces.
+    :return: The same results as `strptime_lazy()` with that format, or
+             `None` if the input is not a valid date in a layout handled
+             here (in which case the caller should use the general code).
+    '''
+    length = len(data_string)
+    if length < 16 or data_string[4] != '-' or data_string[7] != '-' or data_string[13] != ':':
+        return None
+    separator = data_string[10]
+    if separator != 'T' and separator != ' ':
+        return None
+    digits = data_string[0:4] + data_string[5:7] + data_string[8:10] + data_string[11:13] + data_string[14:16]
+    seconds = fraction = ''
+    i = 16
+    if length > 18 and data_string[16] == ':':
+        seconds = data_string[17:19]
+        digits += seconds
+        i = 19
+        if length > 20 and data_string[19] == '.':
+            i = 20
+            while i < length and data_string[i] in DIGITS:
+                i += 1
+            fraction = data_string[20:i]
+            if not 0 < len(fraction) < 7:
+                return None
+    zone = data_string[i:]
+    if len(zone) == 5 or len(zone) == 6:
+        # without seconds the regexp takes the sign as a separator (and
+        # fails), so leave that to strptime.
+        if not seconds or zone[0] not in '+-' or zone[-2] not in '012345' or len(zone) == 6 and zone[3] != ':':
+            return None
+        digits += zone[1:3] + zone[-2:]
+    elif zone and zone != 'Z':
+        return None
+    # ascii only (int() accepts other digits, but they are rare enough to
+    # leave to the regexp)
+    if digits.strip(DIGITS):
+        return None
+
+    year, month, day = int(digits[0:4]), int(digits[4:6]), int(digits[6:8])
+    hour, minute = int(digits[8:10]), int(digits[10:12])
+    second = int(seconds) if seconds else 0
+    if hour > 23 or minute > 59 or second > 59:
+        return None
+    if not 0 < month < 13 or year < 1:
+        return None
+    leap = year % 4 == 0 and (year % 100 != 0 or year % 400 == 0)
+    if not 0 < day <= DAYS_IN_MONTH[month] + (leap and month == 2):
+        return None
+    julian = DAYS_BEFORE_MONTH[month] + day + (leap and month > 2)
+    tz, tzname, gmtoff = -1, None, None
+    if zone == 'Z':
+        tz, tzname = locale_tz(zone), zone
+    elif zone:
+        gmtoff = (int(zone[1:3]) * 60 + int(zone[-2:])) * 60
+        if zone[0] == '-':
+            gmtoff = -gmtoff
+
+    shape = (separator, ':00' if seconds else '', '.0' if fraction else '', ISO_ZONES[len(zone)])
+    return (TimeResult(year, month, day, hour, minute, second,
+                       int(fraction + '0' * (6 - len(fraction))) if fraction else 0,
+                       tz, tzname, gmtoff, julian=julian),
+            _iso_write_format(format, shape))
 
 
 def _strip(fmt, to_write=DEFAULT_TO_WRITE):
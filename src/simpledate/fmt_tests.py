@@ -1,8 +1,12 @@
 
 from unittest import TestCase
 from re import compile
-from simpledate import DMY
-from simpledate.fmt import _to_regexp, reconstruct, DEFAULT_TO_REGEX, strip, invert, HIDE_CHOICES
+from simpledate import DMY, DEFAULT_FORMATS, ISO_8601
+from simpledate.fmt import _to_regexp, reconstruct, DEFAULT_TO_REGEX, strip, invert, auto_invert, HIDE_CHOICES, strptime, strptime_first, strptime_lazy, \
+    strptime_iso, to_regexp, to_combined_regexp, set_cache_max_size, CACHE_MAX_SIZE, \
+    _CACHED_REGEXP
+from simpledate.utils import PublishedCache
+from threading import Thread, Lock
 
 
 class RegexpTest(TestCase):
@@ -70,6 +74,127 @@ class ParserTest(TestCase):
         self.assert_reconstruct('ab', 'a %?b', 'ab')
         self.assert_reconstruct('a b', 'a %?b', 'a b')
         self.assert_reconstruct('%%%M!{|}', '%%%M!{|}', '%59!{|}')
+        self.assert_reconstruct('%%b', '%%%(b%)%?', '%b')
+        self.assert_reconstruct('%%', '%%%(b%)%?', '%')
+
+
+def as_tuple(parsed):
+    '''The results of `strptime_lazy()` as those of `strptime()`.'''
+    result, write_format = parsed
+    try:
+        date_time, fraction = result.astuple()
+    except ValueError:  # eg 30th February
+        return None
+    return date_time, fraction, write_format
+
+
+class CombinedTest(TestCase):
+
+    def assert_first(self, text, formats):
+        index, parsed = strptime_first(text, formats)
+        for i, fmt in enumerate(formats):
+            try:
+                target = strptime_lazy(text, fmt)
+            except ValueError:
+                assert i != index or parsed is None, (text, fmt)
+                continue
+            if parsed is None:
+                # the first match was partial, so later formats are tried
+                assert i > index, (text, i, index)
+            else:
+                assert i == index, (text, i, index)
+                assert as_tuple(parsed) == as_tuple(target), (parsed, target)
+            return
+        assert parsed is None, parsed
+
+    def test_first(self):
+        formats = auto_invert(DMY + DEFAULT_FORMATS)
+        for text in '2013', '08/06/2013 15:51:00 UTC', '2013-06-08T12:34:56.789Z', \
+                    'Sun, 02 Jun 2013 13:26:58 -0300', '130706062100Z', 'May 25 23:59:59 2012 GMT', \
+                    '2013-06-08 12:34 junk', 'junk', '2013-02-30', '30 Feb 2013 12:00:00 UTC':
+            self.assert_first(text, formats)
+            self.assert_first(text, tuple(reversed(formats)))
+        index, parsed = strptime_first('%59!(|)', ('%H', '%%%M!(|)'))
+        assert index == 1, index
+        assert parsed[1] == '%%%M!(|)', parsed
+
+    def test_reorder(self):
+        formats = auto_invert(DMY + DEFAULT_FORMATS)
+        _, combined, positions = to_combined_regexp(formats)
+        _, reordered, reversed_positions = to_combined_regexp(tuple(reversed(formats)))
+        assert combined is reordered
+        assert [len(formats) - 1 - p for p in positions] == list(reversed_positions), (positions, reversed_positions)
+
+
+class IsoTest(TestCase):
+
+    def assert_iso(self, text, fast):
+        parsed = strptime_iso(text, ISO_8601[0])
+        assert (parsed is not None) == fast, (text, parsed)
+        try:
+            target = strptime(text, ISO_8601[0])
+        except ValueError:
+            target = None
+        assert parsed is None or as_tuple(parsed) == target, (text, parsed, target)
+
+    def test_iso(self):
+        for text in '2013-06-08T12:34', '2013-06-08 12:34:56', '2013-06-08T12:34:56.7', \
+                    '2013-06-08T12:34:56.789012Z', '2012-02-29T23:59:59-03:30', '1900-03-01 00:00:00+0100', \
+                    '2000-12-31T00:00:00.5-00:00', '2013-06-08T12:34Z':
+            self.assert_iso(text, True)
+        for text in '2013', '2013-06-08', '20130608T123456', '2013-06-08t12:34', '2013-06-08T12:34:56.1234567', \
+                    '2013-02-29T12:34', '2013-13-08T12:34', '2013-06-08T24:00', '2013-06-08T12:34:60', \
+                    '2013-06-08T12:34:56.', '2013-06-08T12:34:56 Z', '2013-06-08T12:34:56+01.00', \
+                    '2013-06-08T12:34:56+0160', '2013-06-08T12:34:56 UTC', '\u0662013-06-08T12:34', \
+                    '2013-06-08T12:34:56+01:00junk', '2013-06-08T12:34+01:00':
+            self.assert_iso(text, False)
+
+
+class LazyTest(TestCase):
+
+    def test_lazy(self):
+        result, write_format = strptime_lazy('2013-06-08 12:34', '%Y-%m-%d %H:%M')
+        assert result._julian == -1 and result._weekday == -1, result
+        assert result.weekday == 5, result.weekday
+        assert result.julian == 159, result.julian
+        assert result.astuple() == ((2013, 6, 8, 12, 34, 0, 5, 159, -1, None, None), 0), result.astuple()
+        result, _ = strptime_lazy('2013-02-30', '%Y-%m-%d')
+        assert result.day == 30, result
+        with self.assertRaises(ValueError):
+            result.julian
+        with self.assertRaises(ValueError):
+            strptime('2013-02-30', '%Y-%m-%d')
+        assert strptime('02-29', '%m-%d')[0][:8] == (1900, 2, 29, 0, 0, 0, 0, 60), strptime('02-29', '%m-%d')
+
+
+class CacheTest(TestCase):
+
+    def test_once(self):
+        calls = []
+        def square(x):
+            calls.append(x)
+            return x * x
+        cache = PublishedCache(square, 10, Lock())
+        threads = [Thread(target=lambda: [cache(i % 5) for i in range(1000)]) for _ in range(8)]
+        for thread in threads: thread.start()
+        for thread in threads: thread.join()
+        assert sorted(calls) == list(range(5)), calls
+        assert cache(3) == 9
+        for i in range(20): cache(i)
+        assert len(cache) == 10, len(cache)
+        assert len(calls) == 20, calls  # 0-4 cached, 5-19 new
+        cache.cache_clear()
+        assert len(cache) == 0
+
+    def test_max_size(self):
+        try:
+            set_cache_max_size(2)
+            for fmt in '%Y', '%m', '%d':
+                assert to_regexp(fmt) is to_regexp(fmt)
+                assert len(to_regexp(fmt)) == 3, to_regexp(fmt)
+            assert len(_CACHED_REGEXP) == 2, len(_CACHED_REGEXP)
+        finally:
+            set_cache_max_size(CACHE_MAX_SIZE)
 
 
 class StripTest(TestCase):
@@ -0,0 +1,155 @@
+
+from array import array
+from collections import namedtuple
+from functools import partial
+from itertools import islice
+from multiprocessing import Pool
+import datetime as dt
+from pytz import utc
+from simpledate import SimpleDateParser, PyTzFactory, DEFAULT_FORMATS, get_shared
+
+
+# Parse many dates using a pool of processes (parsing is pure Python, so
+# threads do not help).  Each worker keeps its own parser and timezone
+# factory, so the caches they build up are re-used across chunks, and the
+# results are returned as compact arrays rather than pickled objects.
+
+# (c) 2013 Andrew Cooke (andrew@acooke.org)
+# Released into the public domain for any use, but with absolutely no warranty.
+
+
+EPOCH = dt.datetime(1970, 1, 1, tzinfo=utc)
+ONE_MICROSECOND = dt.timedelta(microseconds=1)
+ONE_SECOND = dt.timedelta(seconds=1)
+
+ParseResults = namedtuple('ParseResults', 'times offsets format_ids formats errors')
+ParseResults.__doc__ = '''
+The results from `parse_many()`, in the order of the input.
+
+times: UTC microseconds since the epoch (`array('q')`).
+offsets: The offset (seconds, added to UTC to give local time) of each
+         date (`array('i')`).
+format_ids: An index into `formats` for each date, or -1 on error
+            (`array('i')`).
+formats: The (write) formats used.
+errors: A dict from the index of each date that failed to a description of
+        the error (times and offsets for these are zero).
+'''
+
+# the state of a pool worker process (see _start).
+WORKER = {}
+
+
+def parse_many(dates, processes=None, chunksize=1000, formats=DEFAULT_FORMATS,
+               tz=None, is_dst=False, country=None, unsafe=False):
+    '''
+    Parse a sequence of dates using a pool of processes.  The results are
+    the same as calling `SimpleDateParser(formats).parse()` for each date.
+
+    :param dates: The date strings to parse.
+    :param processes: The number of processes (`None` is the number of
+                      CPUs; 1 parses in this process, without a pool).
+    :param chunksize: The number of dates sent to a process at a time.
+    :param formats: The formats to try (see `SimpleDateParser`).
+    :param tz: A time zone to use if none available in the date (`None` is
+               local).
+    :param is_dst: Is the date known to be summertime?  (`None` is
+                   'unknown').
+    :param country: A country code (or list of codes) to restrict the
+                    choice of timezone.
+    :param unsafe: Take the first timezone found.
+    :return: A `ParseResults` instance.
+    '''
+    config = (formats, tz, is_dst, country, unsafe)
+    chunks = _chunks(dates, chunksize)
+    if processes == 1:
+        # local state, so that concurrent calls (in threads) are separate.
+        return _collect(map(partial(_parse, _state(*config)), chunks))
+    else:
+        with Pool(processes, initializer=_start, initargs=config) as pool:
+            return _collect(pool.imap(_parse_chunk, chunks))
+
+
+def _chunks(dates, chunksize):
+    '''
+    :param dates: The date strings to parse.
+    :param chunksize: The number of dates in each chunk.
+    :return: A sequence of (offset, list of dates) pairs.
+    '''
+    dates, offset = iter(dates), 0
+    while True:
+        chunk = list(islice(dates, chunksize))
+        if not chunk:
+            return
+        yield offset, chunk
+        offset += len(chunk)
+
+
+def _state(formats, tz, is_dst, country, unsafe):
+    '''
+    :return: The parser, timezone factory and arguments used to parse.
+    '''
+    factory = get_shared('parallel_tz_factory', PyTzFactory)
+    return SimpleDateParser(formats), factory, dict(tz=tz, is_dst=is_dst, country=country, unsafe=unsafe)
+
+
+def _start(formats, tz, is_dst, country, unsafe):
+    '''
+    Create the state for a pool worker process.
+    '''
+    WORKER['state'] = _state(formats, tz, is_dst, country, unsafe)
+
+
+def _parse_chunk(chunk):
+    '''
+    Parse a chunk of dates in a pool worker process (see `_parse()`).
+    '''
+    return _parse(WORKER['state'], chunk)
+
+
+def _parse(state, chunk):
+    '''
+    Parse a chunk of dates.
+
+    :param state: The parser, factory and arguments (from `_state()`).
+    :param chunk: The offset of the chunk and a list of dates.
+    :return: The offset, the times, offsets and format ids (indices into
+             the formats that follow), the formats, and a dict of errors by
+             index within the chunk.
+    '''
+    start, dates = chunk
+    parser, factory, kargs = state
+    times, offsets, format_ids = array('q'), array('i'), array('i')
+    formats, errors = {}, {}
+    for i, date in enumerate(dates):
+        try:
+            datetime, _, write_fmt = parser.parse(date, tz_factory=factory, **kargs)
+            time, offset = (datetime - EPOCH) // ONE_MICROSECOND, datetime.utcoffset() // ONE_SECOND
+            format_id = formats.setdefault(write_fmt, len(formats))
+        except Exception as e:  # reported, so that the rest of the batch continues
+            time, offset, format_id = 0, 0, -1
+            errors[i] = str(e)
+        times.append(time)
+        offsets.append(offset)
+        format_ids.append(format_id)
+    return start, times, offsets, format_ids, list(formats), errors
+
+
+def _collect(results):
+    '''
+    Combine the results from each chunk (in order).
+
+    :param results: The results from `_parse_chunk()`.
+    :return: A `ParseResults` instance.
+    '''
+    collected = ParseResults(array('q'), array('i'), array('i'), [], {})
+    known = {}
+    for offset, times, offsets, format_ids, formats, errors in results:
+        # format ids are local to each chunk
+        ids = [known.setdefault(format, len(known)) for format in formats]
+        collected.times.extend(times)
+        collected.offsets.extend(offsets)
+        collected.format_ids.extend(-1 if index < 0 else ids[index] for index in format_ids)
+        collected.errors.update((offset + i, error) for i, error in errors.items())
+    collected.formats.extend(known)
+    return collected
@@ -0,0 +1,48 @@
+
+from unittest import TestCase
+from pytz import utc
+from simpledate import SimpleDateParser, PyTzFactory, DEFAULT_FORMATS
+from simpledate.parallel import parse_many, WORKER
+import datetime as dt
+
+
+class ParallelTest(TestCase):
+
+    DATES = ['2013-06-08 12:34:56 EDT', '2013-01-08T00:00:00Z', 'Sat, 08 Jun 2013 12:34:56 -0400',
+             'not a date', '2013-06-08T12:34:56.789+05:30', '2013-02-30', '20130608123456Z'] * 5
+
+    def assert_parse_many(self, dates, **kargs):
+        results = parse_many(dates, **kargs)
+        parser, factory = SimpleDateParser(DEFAULT_FORMATS), PyTzFactory()
+        assert len(results.times) == len(results.offsets) == len(results.format_ids) == len(dates)
+        for i, date in enumerate(dates):
+            try:
+                datetime, _, write_fmt = parser.parse(date, tz='UTC', tz_factory=factory)
+            except Exception:
+                assert results.format_ids[i] == -1, date
+                assert i in results.errors, date
+            else:
+                utc_datetime = dt.datetime(1970, 1, 1, tzinfo=utc) + dt.timedelta(microseconds=results.times[i])
+                assert utc_datetime == datetime, (date, utc_datetime, datetime)
+                assert results.offsets[i] == datetime.utcoffset().total_seconds(), (date, results.offsets[i])
+                assert results.formats[results.format_ids[i]] == write_fmt, (date, results.formats)
+                assert i not in results.errors, date
+
+    def test_single(self):
+        self.assert_parse_many(self.DATES, processes=1, chunksize=3, tz='UTC')
+
+    def test_pool(self):
+        self.assert_parse_many(self.DATES, processes=2, chunksize=4, tz='UTC')
+
+    def test_errors(self):
+        results = parse_many(['2013-06-08', 'not a date'], processes=1, tz='UTC')
+        assert list(results.format_ids) == [0, -1], results.format_ids
+        assert 'Could not parse not a date' in results.errors[1], results.errors
+        results = parse_many([], processes=1)
+        assert len(results.times) == 0 and not results.formats and not results.errors, results
+
+    def test_local(self):
+        # in-process calls keep their own state, so concurrent calls (in
+        # threads) do not see each other's arguments
+        parse_many(['2013-06-08 12:34:56'], processes=1, tz='UTC')
+        assert not WORKER, WORKER
@@ -0,0 +1,138 @@
+
+from collections import defaultdict, OrderedDict
+try:
+    from time import perf_counter_ns
+except ImportError:  # python < 3.7
+    from time import perf_counter
+    def perf_counter_ns():
+        return int(perf_counter() * 1e9)
+
+
+# Counters (and optional timers) for the stages of parsing and timezone
+# search, so that the costs can be exported (eg to a metrics system).
+#
+# A Stats instance can be given to a SimpleDateParser or PyTzFactory, or
+# enabled for everything with `enable()`.  Code that is instrumented calls
+# `active()` once and then does nothing more unless a Stats instance is
+# found:
+#
+#   stats = active(self.__stats)
+#   start = stats.start() if stats else 0
+#   ...
+#   if stats: stats.stop(MATCH, start)
+
+# (c) 2013 Andrew Cooke (andrew@acooke.org)
+# Released into the public domain for any use, but with absolutely no warranty.
+
+
+# the stages that are timed.
+ISO = 'iso'  # the ISO 8601 fast path (the whole parse, or a miss)
+MATCH = 'match'  # regexp match
+EXTRACT = 'extract'  # building the time tuple from a match
+RECONSTRUCT = 'reconstruct'  # building the write format from a match
+EXPAND = 'expand'  # finding the timezones consistent with a search
+DISTINCT = 'distinct'  # filtering timezones with the same offset
+LOCALIZE = 'localize'  # setting the timezone on a parsed datetime
+
+STAGES = (ISO, MATCH, EXTRACT, RECONSTRUCT, EXPAND, DISTINCT, LOCALIZE)
+
+# the Stats instance used when none is given (see `enable()`).
+GLOBAL = None
+
+
+class Stats:
+    '''
+    Counts for each stage and, if `timers` is true, the total time
+    (nanoseconds).
+
+    Updates are not locked, so counts from threads that share an instance
+    may occasionally be lost.
+    '''
+
+    def __init__(self, timers=False):
+        '''
+        :param timers: Measure the time of each stage (using `perf_counter_ns`)?
+        :return: A new instance, with zero counts.
+        '''
+        self.timers = timers
+        self.counts = defaultdict(int)
+        self.times = defaultdict(int)
+
+    def start(self):
+        '''
+        :return: A value to pass to `stop()` (zero if not timing).
+        '''
+        return perf_counter_ns() if self.timers else 0
+
+    def stop(self, stage, start):
+        '''
+        Record a stage.
+
+        :param stage: The name of the stage (eg MATCH).
+        :param start: The value from `start()`.
+        '''
+        self.counts[stage] += 1
+        if start:
+            self.times[stage] += perf_counter_ns() - start
+
+    def count(self, name, n=1):
+        '''
+        :param name: The name of a counter.
+        :param n: The amount to add.
+        '''
+        self.counts[name] += n
+
+    def snapshot(self):
+        '''
+        :return: An ordered dict from each name to a dict with `count` and
+                 (if timed) `ns` values.
+        '''
+        result = OrderedDict()
+        names = [name for name in STAGES if name in self.counts] + \
+                sorted(name for name in self.counts if name not in STAGES)
+        for name in names:
+            result[name] = {'count': self.counts[name]}
+            if name in self.times:
+                result[name]['ns'] = self.times[name]
+        return result
+
+    def reset(self):
+        '''
+        Set all counts and times to zero.
+        '''
+        self.counts.clear()
+        self.times.clear()
+
+    def __repr__(self):
+        return '{0}({1})'.format(self.__class__.__name__, ', '.join(
+            '{0}={1}'.format(name, values['count']) for name, values in self.snapshot().items()))
+
+
+def enable(timers=False):
+    '''
+    Record statistics for all parsers and factories that do not have their
+    own Stats instance.
+
+    :param timers: Measure the time of each stage?
+    :return: The (new) Stats instance.
+    '''
+    global GLOBAL
+    GLOBAL = Stats(timers)
+    return GLOBAL
+
+
+def disable():
+    '''
+    Stop recording global statistics.
+    '''
+    global GLOBAL
+    GLOBAL = None
+
+
+def active(stats=None):
+    '''
+    :param stats: A Stats instance (eg for a parser), or `None`.
+    :return: The instance to use (`stats`, or the global instance, which is
+             `None` unless enabled).
+    '''
+    return GLOBAL if stats is None else stats
@@ -0,0 +1,54 @@
+
+from unittest import TestCase
+import datetime as dt
+from simpledate import SimpleDateParser, PyTzFactory, SimpleDate, RFC_2822, DEFAULT_FORMATS
+from simpledate.stats import Stats, enable, disable, active, ISO, MATCH, EXTRACT, RECONSTRUCT, EXPAND, DISTINCT, LOCALIZE
+import simpledate.stats
+
+
+class StatsTest(TestCase):
+
+    def test_parser(self):
+        stats = Stats(timers=True)
+        parser, factory = SimpleDateParser(RFC_2822 + DEFAULT_FORMATS, stats=stats), PyTzFactory(stats=stats, cache_size=0)
+        parser.parse('Sat, 08 Jun 2013 12:34:56 EDT', tz_factory=factory)
+        parser.parse('2013-06-08 12:34:56 UTC', tz_factory=factory)
+        snapshot = stats.snapshot()
+        assert list(snapshot) == [MATCH, EXTRACT, RECONSTRUCT, EXPAND, DISTINCT, LOCALIZE], snapshot
+        assert snapshot[MATCH]['count'] == 2, snapshot
+        assert snapshot[EXTRACT]['count'] == 2, snapshot
+        assert snapshot[LOCALIZE]['count'] == 2, snapshot
+        assert snapshot[EXPAND]['count'] == 2, snapshot
+        assert snapshot[DISTINCT]['count'] == 2, snapshot
+        assert all(values['ns'] > 0 for values in snapshot.values()), snapshot
+        stats.reset()
+        assert not stats.snapshot()
+
+    def test_counts_only(self):
+        stats = Stats()
+        SimpleDateParser(stats=stats).parse('2013-06-08 12:34:56', tz='UTC')
+        snapshot = stats.snapshot()
+        # the ISO 8601 fast path is counted as a single stage
+        assert snapshot == {ISO: {'count': 1}, LOCALIZE: {'count': 1}}, snapshot
+        stats.count('dates', 3)
+        assert repr(stats) == 'Stats(iso=1, localize=1, dates=3)', repr(stats)
+
+    def test_iso_miss(self):
+        stats = Stats()
+        # not a layout handled by the fast path, so the regexp is used
+        SimpleDateParser(stats=stats).parse('2013-06-08 12:34:56 UTC')
+        assert stats.counts[ISO] == 1 and stats.counts[MATCH] == 1, stats
+
+    def test_global(self):
+        own = Stats()
+        try:
+            stats = enable()
+            assert active() is stats and active(own) is own
+            SimpleDate('2013-06-08 12:34:56', tz='America/New_York', tz_factory=PyTzFactory(cache_size=0))
+            PyTzFactory(stats=own, cache_size=0).search('EDT', datetime=dt.datetime(2013, 6, 8), country='US')
+            assert stats.counts[ISO] == 1 and stats.counts[EXPAND] >= 1, stats
+            assert stats.counts[DISTINCT] == 0, stats
+            assert own.counts[EXPAND] == 1 and own.counts[DISTINCT] == 1, own
+        finally:
+            disable()
+        assert simpledate.stats.GLOBAL is None and active() is None
@@ -1,7 +1,11 @@
 
 from unittest import TestCase
 from pytz import timezone, utc
-from simpledate import SimpleDate, SimpleDateError, SimpleDateParser, DMY, MRUSortedIterable, DEFAULT_FORMAT, DEFAULT_DATE_PARSER, DEFAULT_TZ_FACTORY, take, NoTimezone, AmbiguousTimezone, SingleInstantTz, prefer, tzinfo_utcoffset, best_guess_utc, MDY, invert, ISO_8601, SingleInstantTzError
+from simpledate.utils import ShapeClassifier, shape
+from simpledate.fmt import _to_regexp_full
+from simpledate import SimpleDate, SimpleDateError, SimpleDateParser, PyTzFactory, DMY, MRUSortedIterable, DEFAULT_FORMAT, DEFAULT_DATE_PARSER, DEFAULT_TZ_FACTORY, take, NoTimezone, AmbiguousTimezone, SingleInstantTz, IntervalTz, prefer, tzinfo_utcoffset, best_guess_utc, MDY, invert, ISO_8601, SingleInstantTzError
+from threading import Thread, Lock
+from logging import getLogger
 import datetime as dt
 import time as t
 
@@ -103,8 +107,10 @@ class ConstructorTest(TestCase):
 
     def test_unlimited_bug(self):
         str(SimpleDate('2016-06-01 00:00:00UTC') + dt.timedelta(days=10))
+        # valid until the next transition in Chile (2016-08-14)
+        assert str(SimpleDate('2016-06-01 00:00:00CLT') + dt.timedelta(days=10)) == '2016-06-11 00:00:00CLT'
         with self.assertRaisesRegex(SingleInstantTzError, 'defined only'):
-            str(SimpleDate('2016-06-01 00:00:00CLT') + dt.timedelta(days=10))
+            str(SimpleDate('2016-06-01 00:00:00CLT') + dt.timedelta(days=100))
 
     def test_utc_bug(self):
         assert str(SimpleDate('2016-06-01 00:00:00', tz='UTC') + dt.timedelta(days=10)) == '2016-06-11 00:00:00'
@@ -114,6 +120,18 @@ class ConstructorTest(TestCase):
         assert str(SimpleDate(1472338800, tz='BST', country='GB', format=MDY)) == '08/28/2016 00:00:00.000000 BST'
 
 
+    def test_from_parts(self):
+        date, day = SimpleDate('2013-06-08 12:34:56 America/New_York'), dt.timedelta(days=1)
+        # the fast paths give the same results as the full constructor
+        for fast, slow in ((date + day, SimpleDate(datetime=date.datetime + day, format=date.format)),
+                           (date - day, SimpleDate(datetime=date.datetime - day, format=date.format)),
+                           (date.convert(utc), SimpleDate(datetime=date.datetime.astimezone(utc), format=date.format)),
+                           (date.replace(hour=1), SimpleDate(datetime=date.datetime.replace(hour=1), format=date.format))):
+            assert type(fast) is SimpleDate, type(fast)
+            assert fast == slow and repr(fast) == repr(slow), (fast, slow)
+        # naive values are still localized
+        assert (date.naive + day).tzinfo is not None
+
 class ParserTest(TestCase):
 
     def test_parse(self):
@@ -173,15 +191,53 @@ class ParserTest(TestCase):
         oneamBST = SimpleDate("2008-08-24T01:00:00+01:00", debug=True).normalized
         assert oneamBST == midnightUTC
 
+    def test_invalid_date(self):
+        with self.assertRaisesRegex(SimpleDateError, 'Could not parse'):
+            SimpleDate('2013-02-30 UTC')
+        # the first format matches, but is not a valid date, so the next is used
+        datetime, read_fmt, _ = SimpleDateParser(('%Y-%m-%d', '%Y-%m-%M')).parse('2013-02-30', tz='UTC')
+        assert read_fmt == '%Y-%m-%M' and (datetime.day, datetime.minute) == (1, 30), datetime
+
 class TZFactoryTest(TestCase):
 
     def test_country(self):
         with self.assertRaisesRegex(AmbiguousTimezone, "2 distinct timezones"):
             DEFAULT_TZ_FACTORY.search(datetime=dt.datetime(2012, 5, 19, 12), country='CL', debug=DEBUG)
         tz = DEFAULT_TZ_FACTORY.search('EDT', datetime=dt.datetime(2012, 5, 19, 12), country='US', debug=DEBUG)
-        assert repr(tz) == "SingleInstantTz(datetime.timedelta(-1, 72000), 'EDT', datetime.datetime(2012, 5, 19, 16, 0, tzinfo=<UTC>))", repr(tz)
+        assert repr(tz) == "IntervalTz(datetime.timedelta(days=-1, seconds=72000), 'EDT', datetime.datetime(2012, 3, 11, 7, 0, tzinfo=<UTC>), datetime.datetime(2012, 11, 4, 6, 0, tzinfo=<UTC>))", repr(tz)
         tz = DEFAULT_TZ_FACTORY.search('EDT', datetime=dt.datetime(2012, 5, 19, 12), debug=DEBUG)
-        assert repr(tz) == "SingleInstantTz(datetime.timedelta(-1, 72000), 'EDT', datetime.datetime(2012, 5, 19, 16, 0, tzinfo=<UTC>))", repr(tz)
+        assert repr(tz) == "IntervalTz(datetime.timedelta(days=-1, seconds=72000), 'EDT', datetime.datetime(2012, 3, 11, 7, 0, tzinfo=<UTC>), datetime.datetime(2012, 11, 4, 6, 0, tzinfo=<UTC>))", repr(tz)
+
+    def test_interned(self):
+        datetime = dt.datetime(2012, 5, 19, 12)
+        tz = DEFAULT_TZ_FACTORY.search('EDT', datetime=datetime, country='US')
+        assert DEFAULT_TZ_FACTORY.search('EDT', datetime=datetime, country='US') is tz
+        # the same offset, name and interval, from a different zone
+        assert IntervalTz(timezone('America/Detroit'), datetime.replace(month=8), False) is tz
+        assert IntervalTz(timezone('America/Detroit'), datetime.replace(month=12), False) is not tz
+        assert IntervalTz(timezone('America/Chicago'), datetime, False) is not tz
+        single = SingleInstantTz(timezone('America/Detroit'), datetime, False)
+        assert SingleInstantTz(timezone('America/New_York'), datetime, False) is single
+        assert SingleInstantTz(timezone('America/Detroit'), datetime.replace(hour=13), False) is not single
+
+    def test_interval_candidates(self):
+        # new york and santiago share an offset only between santiago's
+        # transitions, so the result is valid only then
+        tz = PyTzFactory(cache_size=0).search(('America/New_York', 'America/Santiago'), datetime=dt.datetime(2013, 6, 8, 12))
+        assert (tz.start, tz.end) == (dt.datetime(2013, 4, 28, 3, tzinfo=utc), dt.datetime(2013, 9, 8, 4, tzinfo=utc)), repr(tz)
+        tz.utcoffset(dt.datetime(2013, 9, 1, tzinfo=utc))
+        with self.assertRaises(SingleInstantTzError):
+            tz.utcoffset(dt.datetime(2013, 10, 1, tzinfo=utc))
+
+    def test_unsafe_recent(self):
+        # unsafe searches prefer the zone returned most recently
+        datetime, factory = dt.datetime(2013, 6, 8, 12), PyTzFactory(cache_size=0)
+        tz = factory.search('IST', datetime=datetime, unsafe=True)
+        assert tz.utcoffset(datetime) == dt.timedelta(hours=5, minutes=30), tz
+        tz = factory.search('IST', datetime=datetime, country='IE', unsafe=True)
+        assert tz.utcoffset(datetime) == dt.timedelta(hours=1), tz
+        tz = factory.search('IST', datetime=datetime, unsafe=True)
+        assert tz.utcoffset(datetime) == dt.timedelta(hours=1), tz
 
     def test_epoch0_bug(self):
         with self.assertRaisesRegex(SimpleDateError, "No timezone found"):
@@ -215,6 +271,36 @@ class TZFactoryTest(TestCase):
         assert offset_nsw != offset_qns != offset_est != offset_nsw
 
 
+    def test_cache(self):
+        factory, first = PyTzFactory(cache_size=10), None
+        for day in range(1, 6):
+            tz = factory.search('EDT', datetime=dt.datetime(2013, 6, day, 12), debug=DEBUG)
+            assert tz.utcoffset(dt.datetime(2013, 6, day, 16, tzinfo=utc)) == dt.timedelta(hours=-4)
+            # the wrapped timezone is cached too
+            first = first or tz
+            assert tz is first, (tz, first)
+        info = factory.cache_info()
+        assert (info.hits, info.misses, info.currsize) == (4, 1, 1), info
+        # results change across a transition, so are not re-used
+        factory.search('America/New_York', 'EST', datetime=dt.datetime(2013, 3, 9, 12))
+        with self.assertRaisesRegex(NoTimezone, 'No timezone found'):
+            factory.search('America/New_York', 'EST', datetime=dt.datetime(2013, 3, 11, 12))
+        factory.search('America/New_York', 'EST', datetime=dt.datetime(2013, 3, 9, 12))
+        with self.assertRaisesRegex(NoTimezone, 'No timezone found'):
+            factory.search('America/New_York', 'EST', datetime=dt.datetime(2013, 3, 11, 12))
+        factory.cache_clear()
+        assert factory.cache_info() == (0, 0, 10, 0), factory.cache_info()
+
+
+    def test_default(self):
+        import simpledate
+        assert simpledate.DEFAULT_TZ_FACTORY is DEFAULT_TZ_FACTORY
+        assert simpledate.get_default('DEFAULT_TZ_FACTORY') is DEFAULT_TZ_FACTORY
+        assert simpledate.get_default('DEFAULT_TZ_FACTORY', self) is self
+        with self.assertRaisesRegex(AttributeError, 'DEFAULT_NOTHING'):
+            simpledate.DEFAULT_NOTHING
+
+
 class FixedTimeTimezoneTest(TestCase):
 
     def test_from(self):
@@ -409,6 +495,124 @@ class MRUSortedIterableTest(TestCase):
         assert iterable._data == [4,2,1,3], iterable._data
 
 
+    def test_threads(self):
+        iterable = MRUSortedIterable(range(10))
+        def use():
+            for i in range(1000):
+                for value in iterable:
+                    if value == i % 10: break
+        threads = [Thread(target=use) for _ in range(8)]
+        for thread in threads: thread.start()
+        for thread in threads: thread.join()
+        assert sorted(iterable._data) == list(range(10)), iterable._data
+
+
+class ShapeClassifierTest(TestCase):
+
+    def test_shape(self):
+        assert shape('Sat, 08 Jun 2013 12:34:56 EDT') == 'aaa, 99 aaa 9999 99:99:99 aaa', shape('Sat, 08 Jun 2013 12:34:56 EDT')
+        assert shape('2013-06-08T12:34:56.7+0400') == '9999-99-99a99:99:99.9+9999', shape('2013-06-08T12:34:56.7+0400')
+
+    def test_learn(self):
+        classifier = ShapeClassifier([1,2,3], 2, Lock())
+        assert classifier.get('a') is None
+        classifier.learn('a', 2)
+        classifier.learn('b', 3, 'three')
+        assert classifier.get('a') == ((2,1,3), None), classifier.get('a')
+        assert classifier.get('b') == ((3,1,2), 'three'), classifier.get('b')
+        classifier.learn('c', 1)  # discards a
+        assert classifier.get('a', ()) == () and len(classifier) == 2
+        classifier.clear()
+        assert not len(classifier)
+
+    def test_parser(self):
+        parser = SimpleDateParser(DMY + MDY)
+        assert parser.parse('23/06/2013 11:49', tz='UTC')[0].month == 6
+        # only MDY works, so it is most recently used
+        assert parser.parse('6/23/2013 11:49', tz='UTC')[0].month == 6
+        # but DMY worked for a date of this shape
+        assert parser.parse('01/02/2013 11:49', tz='UTC')[0].month == 2
+        assert parser.parse('1/02/2013 11:49', tz='UTC')[0].month == 1
+
+    def test_invalid(self):
+        parser = SimpleDateParser(ISO_8601 + DMY)
+        assert parser.parse('2013-06-08', tz='UTC')[1] == ISO_8601[0]
+        # invalid for ISO 8601, but DMY accepts it as a year and time
+        datetime, read_fmt, _ = parser.parse('2013-02-30', tz='UTC')
+        assert read_fmt == invert(DMY[0]) and datetime.month == 1, datetime
+        assert parser._shapes.get(shape('2013-06-09'))[0][0] == ISO_8601[0]
+        datetime, read_fmt, _ = parser.parse('2013-06-09', tz='UTC')
+        assert read_fmt == ISO_8601[0] and datetime.month == 6 and datetime.day == 9, datetime
+
+    def test_known(self):
+        parser = SimpleDateParser()
+        date = 'Sat, 08 Jun 2013 12:34:56 EDT'
+        datetime, read_fmt, write_fmt = parser.parse(date, unsafe=True)
+        formats, regexp = parser._shapes.get(shape(date))
+        assert formats[0] == read_fmt and regexp == _to_regexp_full(read_fmt)
+        # the same shape, parsed directly with the known format
+        assert parser.parse('Sun, 09 Jun 2013 12:34:56 EDT', unsafe=True)[1:] == (read_fmt, write_fmt)
+        assert parser.parse('2013-06-08 12:34:56 EDT', unsafe=True)[1] == ISO_8601[0]
+        # a mismatch falls back to the other formats
+        parser = SimpleDateParser(DMY + MDY)
+        assert parser.parse('23/06/2013 11:49', tz='UTC')[0].day == 23
+        assert parser.parse('06/23/2013 11:49', tz='UTC')[0].day == 23
+        assert parser._shapes.get(shape('06/23/2013 11:49'))[0][0] == invert(MDY[0])
+        # a date that only a later format accepts does not replace the
+        # known format, which still parses valid dates of the same shape
+        parser = SimpleDateParser(('%d/%m/%y', '%y/%m/%d'))
+        assert parser.parse('08/06/13', tz='UTC')[1] == '%d/%m/%y'
+        assert parser.parse('30/02/12', tz='UTC')[1] == '%y/%m/%d'
+        datetime, read_fmt, _ = parser.parse('09/06/13', tz='UTC')
+        assert read_fmt == '%d/%m/%y' and datetime.date() == dt.date(2013, 6, 9), datetime
+
+
+class SharedTest(TestCase):
+
+    def test_get_local(self):
+        import simpledate
+        with self.assertWarns(DeprecationWarning):
+            value = simpledate.get_local('test_shared', lambda: [])
+        assert value is simpledate.get_shared('test_shared', lambda: None)
+
+
+class DebugLogTest(TestCase):
+
+    def test_disabled(self):
+        log = PyTzFactory()._get_log(False)
+        assert not log
+        log('Ignored {0}', object())
+
+    def test_logger(self):
+        logger = getLogger('simpledate.test')
+        with self.assertLogs(logger, 'DEBUG') as logs:
+            SimpleDate('2013-06-08 12:34:56 UTC', debug=logger)
+        assert 'SimpleDate: Created 2013-06-08 12:34:56 UTC' in logs.output[-1], logs.output
+        assert any(line.startswith('DEBUG:simpledate.test:PyTzFactory: ') for line in logs.output), logs.output
+
+
+class ThreadTest(TestCase):
+
+    def test_shared(self):
+        dates = ['2013-06-08 12:34 EDT', '8/6/2013 12:34 BST', '2013-06-08T12:34:56-04:00',
+                 '2013-01-08T00:00:00Z', '2013-06-08T12:34:56.789+05:30', '2013-06-08 12:34 CLT'] * 20
+        parser, factory = SimpleDateParser(DMY + ISO_8601), PyTzFactory(cache_size=5)
+        expected = [parser.parse(date, tz_factory=PyTzFactory(), unsafe=True) for date in dates]
+        results, errors = {}, []
+        def parse(offset):
+            try:
+                order = dates[offset:] + dates[:offset]
+                results[offset] = [parser.parse(date, tz_factory=factory, unsafe=True) for date in order]
+            except Exception as e:
+                errors.append(e)
+        threads = [Thread(target=parse, args=(offset,)) for offset in range(8)]
+        for thread in threads: thread.start()
+        for thread in threads: thread.join()
+        assert not errors, errors
+        for offset, found in results.items():
+            assert found == expected[offset:] + expected[:offset], offset
+
+
 class StackOverflowTest(TestCase):
 
     def test_17248250(self):
@@ -430,3 +634,51 @@ class StackOverflowTest(TestCase):
     def test_7562868(self):
         date = SimpleDate('20111014T090000', tz='America/Los_Angeles')
         assert date.timestamp == 1318608000.0, date.timestamp
+
+
+class ParseManyTest(TestCase):
+
+    def test_parse_many(self):
+        dates = ['2013-06-08 12:34:56 EDT', '2013-06-09 01:02:03 EDT', '2013-01-08 12:34:56 CLST',
+                 '2013-06-08 12:34:56 -0400', '2013-06-08 12:34:56 America/New_York', '2013-06-08']
+        parsed = list(DEFAULT_DATE_PARSER.parse_many(dates, debug=DEBUG))
+        assert len(parsed) == len(dates), parsed
+        for date, (datetime, read_fmt, write_fmt) in zip(dates, parsed):
+            target = DEFAULT_DATE_PARSER.parse(date)
+            assert datetime == target[0], (datetime, target[0])
+            assert str(datetime.tzinfo) == str(target[0].tzinfo), datetime.tzinfo
+            assert (read_fmt, write_fmt) == target[1:], (read_fmt, write_fmt)
+
+    def test_constant_tz(self):
+        # the search for `tz` is made once, but dates with a zone still
+        # search for that
+        dates = ['2013-06-08 12:34:56', '2013-01-08 12:34:56', '2013-06-08 12:34:56 EDT']
+        for tz, country, n in (('America/New_York', 'US', 3), (timezone('America/New_York'), None, 3), (-240, None, 2)):
+            for date, parsed in zip(dates[:n], DEFAULT_DATE_PARSER.parse_many(dates[:n], tz=tz, country=country)):
+                target = DEFAULT_DATE_PARSER.parse(date, tz=tz, country=country)
+                assert parsed[0] == target[0], (parsed[0], target[0])
+                assert str(parsed[0].tzinfo) == str(target[0].tzinfo), parsed[0].tzinfo
+        assert PyTzFactory.constant('Europe/London')
+        assert not PyTzFactory.constant('EST')
+        with self.assertRaisesRegex(NoTimezone, 'No timezone found'):
+            list(DEFAULT_DATE_PARSER.parse_many(dates, tz='Europe/London', country='US'))
+
+    def test_shared(self):
+        # the second date re-uses the timezone found for the first
+        dates = ['2013-06-08 12:34:56 EDT', '2013-06-09 01:02:03 EDT']
+        first, second = DEFAULT_DATE_PARSER.parse_many(dates)
+        assert first[0].utcoffset() == second[0].utcoffset() == dt.timedelta(hours=-4), second[0]
+        assert str(second[0]) == '2013-06-09 01:02:03-04:00', second[0]
+
+    def test_from_strings(self):
+        dates = ['2013-06-08 12:34:56 EDT', '1/6/2013 UTC', '2013-06-08']
+        for date, simple in zip(dates, SimpleDate.from_strings(dates, format=MDY)):
+            assert simple == SimpleDate(date, format=MDY), simple
+        with self.assertRaisesRegex(SimpleDateError, 'Could not parse'):
+            list(SimpleDate.from_strings(['2013-06-08', 'garbage']))
+
+    def test_from_parts(self):
+        datetime = dt.datetime(2013, 6, 8, 12, tzinfo=utc)
+        for format in (None, '', ' ', 'Y-m-d', '%Y(-%m)'):
+            simple = SimpleDate._from_parts(datetime, format)
+            assert simple.format == SimpleDate(datetime, format=format).format, (format, simple.format)
@@ -0,0 +1,440 @@
+
+from array import array
+from bisect import bisect_right
+import datetime as dt
+from hashlib import sha1
+from os import environ, makedirs, replace, stat, unlink
+from os.path import join, dirname
+import pickle
+from threading import Lock
+from tempfile import NamedTemporaryFile
+import pytz
+from pytz import utc, timezone, _FixedOffset
+from pytz.tzinfo import DstTzInfo, StaticTzInfo
+try:
+    from os import getuid
+except ImportError:  # windows
+    getuid = None
+
+
+# Indices built from the transition tables in pytz.  These let us find the
+# timezones that use an abbreviation (like EST) at a given time without
+# asking every timezone for its name.
+
+# (c) 2013 Andrew Cooke (andrew@acooke.org)
+# Released into the public domain for any use, but with absolutely no warranty.
+
+
+EPOCH = dt.datetime(1970, 1, 1)
+ONE_SECOND = dt.timedelta(seconds=1)
+
+# the limits of time, in seconds from the epoch.
+BEGINNING = (dt.datetime.min - EPOCH) // ONE_SECOND
+END = (dt.datetime.max - EPOCH) // ONE_SECOND
+
+# a naive datetime is local time in some (unknown) zone, so the instant it
+# describes is only known to within a day or so.  pytz also does odd things
+# near transitions (depending on is_dst).  so anything within this many
+# seconds of a transition is not trusted and must be checked directly.
+SLACK = 2 * 24 * 60 * 60
+
+# the index can be cached on disk, in the directory given by
+# SIMPLEDATE_CACHE_DIR (the default is no cache), one file for each version
+# of the timezone data.  change the format to invalidate old files.
+CACHE_DIR = environ.get('SIMPLEDATE_CACHE_DIR') or None
+CACHE_FORMAT = 2
+
+
+def to_seconds(datetime):
+    '''
+    :param datetime: A naive or aware datetime.
+    :return: Whole seconds since the epoch (naive values are taken as UTC).
+    '''
+    if datetime.tzinfo is not None:
+        datetime = datetime.astimezone(utc).replace(tzinfo=None)
+    return (datetime - EPOCH) // ONE_SECOND
+
+
+def intervals(tzinfo):
+    '''
+    :param tzinfo: A pytz timezone.
+    :return: A sequence of (name, start, end) values, in seconds, giving the
+             periods (in UTC) when each name was used, or `None` if the
+             timezone is not one we understand.
+    '''
+    if isinstance(tzinfo, DstTzInfo):
+        starts = [to_seconds(start) for start in tzinfo._utc_transition_times]
+        starts[0] = BEGINNING
+        ends = starts[1:] + [END]
+        names = [info[2] for info in tzinfo._transition_info]
+        merged = []
+        for name, start, end in zip(names, starts, ends):
+            # merge repeated names (typically, offset changes that kept the
+            # same abbreviation).
+            if merged and merged[-1][0] == name and merged[-1][2] == start:
+                merged[-1] = (name, merged[-1][1], end)
+            else:
+                merged.append((name, start, end))
+        return merged
+    elif isinstance(tzinfo, StaticTzInfo):
+        return [(tzinfo._tzname, BEGINNING, END)]
+    else:
+        return None
+
+
+def invariant(tzinfo):
+    '''
+    :param tzinfo: A timezone.
+    :return: True if the timezone has the same name and offset at all times.
+    '''
+    return isinstance(tzinfo, (StaticTzInfo, _FixedOffset, dt.timezone, utc.__class__))
+
+
+def zone_transitions(tzinfo):
+    '''
+    :param tzinfo: A timezone.
+    :return: The times of the transitions in the timezone (seconds), or
+             `None` if the timezone is not one we understand.
+    '''
+    if isinstance(tzinfo, DstTzInfo):
+        return [to_seconds(start) for start in tzinfo._utc_transition_times[1:]]
+    elif invariant(tzinfo):
+        return []
+    else:
+        return None
+
+
+def period(instant, transitions):
+    '''
+    :param instant: A time (from `to_seconds()` or `TzIndex.instant()`).
+    :param transitions: The (sorted) transitions to consider.
+    :return: An identifier that is shared by all times between the same
+             pair of transitions, or `None` if the time is too close to a
+             transition (see SLACK).
+    '''
+    i = bisect_right(transitions, instant - SLACK)
+    if i < len(transitions) and transitions[i] < instant + SLACK:
+        return None
+    else:
+        return i
+
+
+def offset_table(tzinfo):
+    '''
+    :param tzinfo: A pytz timezone.
+    :return: The transitions (seconds) and the offsets (seconds) that apply
+             before the first transition, between each pair, and after the
+             last, as compact arrays, or `None` if the timezone is not one
+             we understand.
+    '''
+    if isinstance(tzinfo, DstTzInfo):
+        return (array('q', zone_transitions(tzinfo)),
+                array('q', (info[0] // ONE_SECOND for info in tzinfo._transition_info)))
+    elif invariant(tzinfo):
+        return array('q'), array('q', [tzinfo.utcoffset(None) // ONE_SECOND])
+    else:
+        return None
+
+
+class TzIndex:
+    '''
+    Map from timezone abbreviations to the timezones that use them, and
+    when.
+
+    Lookups are approximate (see SLACK) so results are one of three values:
+    `True` if the timezone certainly has the name at that time; `False` if it
+    certainly does not; `None` if the caller must check (the index does not
+    know the timezone, or the time is close to a transition).
+    '''
+
+    def __init__(self, timezones):
+        '''
+        :param timezones: The timezones to index (the order is preserved in
+                          the results of `lookup`).
+        :return: A new index.
+        '''
+        # pytz timezones are indexed by zone name (instances with the same
+        # name share the same transitions), so that the index can be saved
+        # and the timezones created only when needed.
+        self.__names = {}  # name -> {zone: (starts, ends)}
+        self.__zones = {}  # zone -> tzinfo (or None if not yet created)
+        self.__direct = []  # timezones we cannot index, in order
+        self.__tables = {}  # tzinfo -> offset_table(tzinfo)
+        for tzinfo in timezones:
+            self.add(tzinfo)
+
+    def add(self, tzinfo):
+        '''
+        :param tzinfo: A timezone to add to the index.
+        '''
+        if tzinfo in self:
+            return
+        found = intervals(tzinfo)
+        if found is None:
+            self.__direct.append(tzinfo)
+        else:
+            self.__zones[tzinfo.zone] = tzinfo
+            for name, start, end in found:
+                starts, ends = self.__names.setdefault(name, {}).setdefault(tzinfo.zone, (array('q'), array('q')))
+                starts.append(start)
+                ends.append(end)
+
+    def __contains__(self, tzinfo):
+        return self.__zone(tzinfo) in self.__zones or tzinfo in self.__direct
+
+    @staticmethod
+    def __zone(tzinfo):
+        '''
+        :param tzinfo: A timezone.
+        :return: The zone name if the timezone can be indexed, otherwise
+                 `None`.
+        '''
+        return tzinfo.zone if isinstance(tzinfo, (DstTzInfo, StaticTzInfo)) else None
+
+    def __tzinfo(self, zone):
+        '''
+        :param zone: The name of an indexed timezone.
+        :return: The timezone (created on first use).
+        '''
+        tzinfo = self.__zones[zone]
+        if tzinfo is None:
+            tzinfo = self.__zones[zone] = timezone(zone)
+        return tzinfo
+
+    def named(self, name):
+        '''
+        :param name: A timezone abbreviation (eg EST).
+        :return: The indexed timezones that have ever used the name, and
+                 any timezones that could not be indexed.
+        '''
+        return list(map(self.__tzinfo, self.__names.get(name, {}))) + self.__direct
+
+    @staticmethod
+    def instant(datetime):
+        '''
+        :param datetime: The time of a lookup.
+        :return: The value to pass to `lookup` and `check`.
+        '''
+        return to_seconds(datetime)
+
+    @staticmethod
+    def __classify(starts, ends, instant):
+        '''
+        :param starts: The start of each interval, in order.
+        :param ends: The end of each interval, in order.
+        :param instant: The time (seconds) we are interested in.
+        :return: True if the instant is well inside an interval, False if it
+                 is well outside all intervals, otherwise None.
+        '''
+        lo, hi = instant - SLACK, instant + SLACK
+        # intervals are disjoint and ordered, so the first that ends after
+        # `lo` is the only candidate for containing the window.
+        i = bisect_right(ends, lo)
+        if i == len(ends) or starts[i] >= hi:
+            return False
+        elif starts[i] <= lo and ends[i] > hi:
+            return True
+        else:
+            return None
+
+    def lookup(self, name, instant):
+        '''
+        :param name: A timezone abbreviation (eg EST).
+        :param instant: The time of the lookup (from `instant()`).
+        :return: A sequence of (tzinfo, certain) pairs for the timezones that
+                 may use the name at that time.  `certain` is `True` or
+                 `None` (see `TzIndex`).
+        '''
+        for zone, (starts, ends) in self.__names.get(name, {}).items():
+            certain = self.__classify(starts, ends, instant)
+            if certain is not False:
+                yield self.__tzinfo(zone), certain
+        for tzinfo in self.__direct:
+            yield tzinfo, None
+
+    def check(self, name, tzinfo, instant):
+        '''
+        :param name: A timezone abbreviation (eg EST).
+        :param tzinfo: The timezone to check.
+        :param instant: The time of the lookup (from `instant()`).
+        :return: Whether the timezone uses that name at that time (see
+                 `TzIndex`).
+        '''
+        zone = self.__zone(tzinfo)
+        if zone not in self.__zones:
+            return None
+        try:
+            starts, ends = self.__names[name][zone]
+        except KeyError:
+            return False
+        return self.__classify(starts, ends, instant)
+
+    def offsets(self, timezones, instant):
+        '''
+        :param timezones: The timezones to check.
+        :param instant: The time of the lookup (from `instant()`).
+        :return: A list with the offset (seconds) of each timezone at that
+                 time, or `None` where the caller must check directly (the
+                 timezone is not understood, or the time is close to a
+                 transition; see SLACK).
+        '''
+        tables, result = self.__tables, []
+        lo, hi = instant - SLACK, instant + SLACK
+        for tzinfo in timezones:
+            try:
+                table = tables[tzinfo]
+            except KeyError:
+                table = offset_table(tzinfo)
+                if table is not None:
+                    # add the range of instants (and offset) for the last
+                    # period found, which is usually the next one needed.
+                    table = [table[0], table[1], (1, 0, None)]
+                # pytz caches these, but other timezones may be created
+                # freely, so are not kept.
+                if isinstance(tzinfo, (DstTzInfo, StaticTzInfo)):
+                    tables[tzinfo] = table
+            except TypeError:  # unhashable
+                table = None
+            if table is None:
+                result.append(None)
+                continue
+            start, end, offset = table[2]
+            if start <= instant <= end:
+                result.append(offset)
+                continue
+            # as period(), inline
+            transitions, offsets = table[0], table[1]
+            i = bisect_right(transitions, lo)
+            if i < len(transitions) and transitions[i] < hi:
+                result.append(None)
+            else:
+                table[2] = (transitions[i-1] + SLACK if i else BEGINNING,
+                            transitions[i] - SLACK if i < len(transitions) else END,
+                            offsets[i])
+                result.append(offsets[i])
+        return result
+
+    def __getstate__(self):
+        '''
+        :return: The index, without timezones (these are created again, by
+                 name, when needed).
+        '''
+        return self.__names, list(self.__zones), self.__direct
+
+    def __setstate__(self, state):
+        '''
+        :param state: The value from `__getstate__`.
+        '''
+        self.__names, zones, direct = state
+        self.__zones = dict.fromkeys(zones)
+        self.__direct = direct
+        self.__tables = {}
+
+
+def tzdata_version(zones):
+    '''
+    :param zones: The names of pytz timezones.
+    :return: A value that changes with the timezone data (the Olson
+             version and the latest modification of the zone files), since
+             distributions may update the data without changing the pytz
+             version.
+    '''
+    with pytz.open_resource('UTC') as source:
+        root = dirname(source.name)
+    latest = 0
+    for zone in zones:
+        try:
+            latest = max(latest, stat(join(root, zone)).st_mtime_ns)
+        except OSError:
+            pass
+    return pytz.OLSON_VERSION, latest
+
+
+def _trusted(path):
+    '''
+    :param path: A cached index.
+    :return: True if the file is ours and only we can change it (pickles
+             can run code, so others must not be able to write them).
+    '''
+    info = stat(path)
+    if getuid is not None and info.st_uid != getuid():
+        return False
+    return not info.st_mode & 0o022
+
+
+def load_index(zones, directory=CACHE_DIR):
+    '''
+    Index the named timezones, using (or saving) a copy on disk when
+    possible.  The copy is used only with the same version of pytz, the
+    same timezone data and the same zones.
+
+    :param zones: The names of pytz timezones (like `common_timezones`).
+    :param directory: The directory for the cached index (`None`, the
+                      default unless SIMPLEDATE_CACHE_DIR is set, disables
+                      the cache).
+    :return: A `TzIndex` for the timezones (in order of name).  The
+             timezones themselves are not created until needed.
+    '''
+    zones = tuple(sorted(zones))
+    path = None
+    if directory is not None:
+        key = (CACHE_FORMAT, pytz.__version__, tzdata_version(zones), zones)
+        path = join(directory, 'tzindex-{0}-{1}-{2}.pickle'.format(
+            CACHE_FORMAT, pytz.__version__, sha1(repr(key[:3]).encode('utf8')).hexdigest()[:12]))
+        try:
+            if _trusted(path):
+                with open(path, 'rb') as source:
+                    saved, index = pickle.load(source)
+                if saved == key:
+                    return index
+        except Exception:  # missing, unreadable, or from some other code
+            pass
+    index = TzIndex(map(timezone, zones))
+    if path:
+        partial = None
+        try:
+            # write a private copy and then rename, so that other processes
+            # (and threads) never see a partial file.
+            makedirs(directory, mode=0o700, exist_ok=True)
+            with NamedTemporaryFile(dir=directory, prefix='tzindex-', suffix='.partial', delete=False) as destination:
+                partial = destination.name
+                pickle.dump((key, index), destination, protocol=pickle.HIGHEST_PROTOCOL)
+            replace(partial, path)
+            partial = None
+        except Exception:  # no cache
+            pass
+        finally:
+            if partial:
+                try:
+                    unlink(partial)
+                except OSError:
+                    pass
+    return index
+
+
+_SHARED = {}  # (zones, extra, directory) -> TzIndex
+_SHARED_LOCK = Lock()
+
+def shared_index(zones, extra=(), directory=CACHE_DIR):
+    '''
+    As `load_index()`, but the index is built (or loaded) once for each set
+    of zones and then shared for the life of the process.  The result must
+    not be modified.
+
+    :param zones: The names of pytz timezones (like `common_timezones`).
+    :param extra: Other timezones to add (these are not saved on disk).
+    :param directory: The directory for the cached index (see
+                      `load_index()`).
+    :return: A `TzIndex` for the timezones.
+    '''
+    key = (tuple(sorted(zones)), tuple(extra), directory)
+    index = _SHARED.get(key)
+    if index is None:
+        with _SHARED_LOCK:
+            index = _SHARED.get(key)  # another thread may have been first
+            if index is None:
+                index = load_index(key[0], directory=directory)
+                for tzinfo in extra:
+                    index.add(tzinfo)
+                _SHARED[key] = index
+    return index
@@ -0,0 +1,122 @@
+from os import listdir, chmod, stat
+from os.path import join
+from tempfile import TemporaryDirectory
+from unittest import TestCase
+from pytz import timezone, common_timezones, NonExistentTimeError
+from simpledate import tzinfo_tzname, tzinfo_utcoffset
+from simpledate.tzindex import TzIndex, load_index, shared_index
+import simpledate.tzindex
+import datetime as dt
+
+
+class TzIndexTest(TestCase):
+
+    def assert_lookup(self, index, zones, name, datetime, is_dst=False):
+        instant = index.instant(datetime)
+        found = dict(index.lookup(name, instant))
+        for tzinfo in zones:
+            try:
+                expected = tzinfo_tzname(tzinfo, datetime, is_dst) == name
+            except NonExistentTimeError:
+                expected = False
+            certain = index.check(name, tzinfo, instant)
+            if expected:
+                assert tzinfo in found, (name, datetime, tzinfo)
+                assert certain is not False, (name, datetime, tzinfo)
+            else:
+                assert found.get(tzinfo) is not True, (name, datetime, tzinfo)
+                assert certain is not True, (name, datetime, tzinfo)
+
+    def test_lookup(self):
+        zones = [timezone(name) for name in common_timezones]
+        index = TzIndex(zones)
+        for name in 'EST', 'EDT', 'CLT', 'CLST', 'BST', 'GMT':
+            for month in range(1, 13):
+                self.assert_lookup(index, zones, name, dt.datetime(2013, month, 1, 12))
+        # close to a transition (US, spring 2013)
+        self.assert_lookup(index, zones, 'EDT', dt.datetime(2013, 3, 10, 3, 30))
+        self.assert_lookup(index, zones, 'EST', dt.datetime(2013, 3, 10, 1, 30))
+
+    def test_certain(self):
+        new_york = timezone('America/New_York')
+        index = TzIndex([new_york])
+        instant = index.instant(dt.datetime(2013, 6, 1))
+        assert index.check('EDT', new_york, instant) is True
+        assert index.check('EST', new_york, instant) is False
+        assert index.check('XYZ', new_york, instant) is False
+        assert index.check('EDT', timezone('Europe/London'), instant) is None
+        instant = index.instant(dt.datetime(2013, 3, 10, 3, 30))
+        assert index.check('EDT', new_york, instant) is None
+
+    def test_offsets(self):
+        zones = [timezone(name) for name in common_timezones] + [dt.timezone(dt.timedelta(hours=3)), None]
+        index = TzIndex(zones)
+        for year in 1900, 1970, 2013, 2037:
+            for month in range(1, 13):
+                datetime = dt.datetime(year, month, 1, 12)
+                for tzinfo, offset in zip(zones, index.offsets(zones, index.instant(datetime))):
+                    if tzinfo is None:
+                        assert offset is None
+                    elif offset is not None:
+                        assert offset == tzinfo_utcoffset(tzinfo, datetime) // dt.timedelta(seconds=1), (tzinfo, datetime, offset)
+        # close to a transition (US, spring 2013)
+        new_york = timezone('America/New_York')
+        assert index.offsets([new_york], index.instant(dt.datetime(2013, 3, 10, 3, 30))) == [None]
+
+    def test_load(self):
+        datetime = dt.datetime(2013, 6, 1, 12)
+        with TemporaryDirectory() as directory:
+            built = load_index(common_timezones, directory=directory)
+            assert len(listdir(directory)) == 1, listdir(directory)
+            loaded = load_index(common_timezones, directory=directory)
+            assert loaded is not built
+            for name in 'EST', 'EDT', 'BST', 'UTC':
+                instant = loaded.instant(datetime)
+                assert list(built.lookup(name, instant)) == list(loaded.lookup(name, instant)), name
+            zones = [timezone(name) for name in common_timezones]
+            self.assert_lookup(loaded, zones, 'EDT', datetime)
+            # a different set of zones is not taken from the cache
+            london = load_index(['Europe/London'], directory=directory)
+            assert london.named('EDT') == [], london.named('EDT')
+            assert london.named('BST') == [timezone('Europe/London')], london.named('BST')
+
+    def test_shared(self):
+        with TemporaryDirectory() as directory:
+            london = shared_index(['Europe/London'], directory=directory)
+            assert shared_index(['Europe/London'], directory=directory) is london
+            assert shared_index(['Europe/London'], directory=None) is not london
+            assert len(listdir(directory)) == 1, listdir(directory)
+
+    def test_load_tzdata(self):
+        with TemporaryDirectory() as directory:
+            load_index(['Europe/London'], directory=directory)
+            # new timezone data (but the same pytz) uses a new file
+            tzdata_version = simpledate.tzindex.tzdata_version
+            try:
+                simpledate.tzindex.tzdata_version = lambda zones: ('new', 0)
+                load_index(['Europe/London'], directory=directory)
+            finally:
+                simpledate.tzindex.tzdata_version = tzdata_version
+            assert len(listdir(directory)) == 2, listdir(directory)
+
+    def test_load_untrusted(self):
+        with TemporaryDirectory() as directory:
+            load_index(['Europe/London'], directory=directory)
+            path = join(directory, listdir(directory)[0])
+            chmod(path, 0o666)
+            # not read, but replaced
+            load_index(['Europe/London'], directory=directory)
+            assert not stat(path).st_mode & 0o022, oct(stat(path).st_mode)
+
+    def test_load_failure(self):
+        dump = simpledate.tzindex.pickle.dump
+        def fail(*args, **kargs):
+            raise TypeError('cannot pickle')
+        with TemporaryDirectory() as directory:
+            try:
+                simpledate.tzindex.pickle.dump = fail
+                index = load_index(['Europe/London'], directory=directory)
+            finally:
+                simpledate.tzindex.pickle.dump = dump
+            assert index.named('BST') == [timezone('Europe/London')]
+            assert listdir(directory) == [], listdir(directory)
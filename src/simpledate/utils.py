@@ -1,13 +1,16 @@
 
-from collections import MutableSet
+from collections import MutableSet, OrderedDict
 
 
 class MRUSortedIterable:
     '''
     An iterable that re-orders the contents to move the most recently used item
-    (the last accessed on the previous iteration) to the start of the sequence.
+    (the last accessed by an iterator that was discarded early) to the start
+    of the sequence.
 
-    IMPORTANT: Not thread safe.
+    The ordering is a list that is never modified once published; a change
+    replaces it as a whole.  So concurrent iterators each see a consistent
+    ordering and a lost update only costs a little efficiency.
     '''
 
     def __init__(self, data):
@@ -16,37 +19,169 @@ class MRUSortedIterable:
         :return: An iterable that adapts to provide MRU values first.
         '''
         self._data = list(data)
-        self._i = 0
 
     def __iter__(self):
         '''
         :return: A new iterator.
         '''
-        # the iterator records the last accessed value in `_i`.  when a new
-        # iterable is requested that points to the last returned (and
-        # presumably used) value.  so at that point we can re-order the data.
-        if self._i:
-            self._data[0], self._data[1:self._i+1] = self._data[self._i], self._data[0:self._i]
-        for self._i, value in enumerate(self._data):
-            yield value
-            # reset on exhaustion.  usefully, this means that the final value was
-        # not OK, so another value was requested.  in this way we can avoid
-        # promoting the last value when no value was used.
-        self._i = 0
+        # if the iterator is closed (typically, discarded) before it is
+        # exhausted then the last value returned was presumably used, so is
+        # promoted.  usefully, exhaustion means that the final value was not
+        # OK (another value was requested), so nothing changes.
+        for value in self._data:
+            try:
+                yield value
+            except GeneratorExit:
+                self.promote(value)
+                raise
+
+    def promote(self, value):
+        '''
+        Record that `value` was used, so that it is moved to the start of the
+        sequence.
+
+        :param value: The value used (which must be present).
+        '''
+        data = self._data
+        if data[0] != value:
+            i = data.index(value)
+            self._data = [value] + data[:i] + data[i+1:]
+
+
+# digits become 9 and (ascii) letters a; everything else is kept.
+SHAPE = str.maketrans(dict([(digit, '9') for digit in '0123456789'] +
+                           [(letter, 'a') for letter in 'abcdefghijklmnopqrstuvwxyzABCDEFGHIJKLMNOPQRSTUVWXYZ']))
+
+def shape(text):
+    '''
+    :param text: A string (eg a date).
+    :return: The shape of the string (eg '9999-99-99 aaa' for
+             '2013-06-08 EDT'), which retains the length, separators and
+             classes of characters, but not the values.
+    '''
+    return text.translate(SHAPE)
+
+
+class ShapeClassifier:
+    '''
+    Learn which value (eg format) suits strings of a given shape (see
+    `shape()`), so that it can be tried first.
+
+    Shapes are only a guide (the values matter too), so the result is an
+    ordering of all the values, with the value that last worked for the
+    shape first, together with any detail given when it was learnt (eg a
+    compiled regexp).  Lookups need no lock; learning takes the lock and,
+    when full, discards the oldest shape.
+    '''
+
+    def __init__(self, data, maxsize, lock):
+        '''
+        :param data: The values to order.
+        :param maxsize: The maximum number of shapes to remember.
+        :param lock: The lock used when learning.
+        :return: A new, empty classifier.
+        '''
+        self._data = tuple(data)
+        self.maxsize = maxsize
+        self.__lock = lock
+        self.__entries = {}
+
+    def get(self, key, default=None):
+        '''
+        :param key: A shape.
+        :param default: The value returned if the shape is unknown.
+        :return: The values (a tuple, with the most likely first) and the
+                 detail for the most likely.
+        '''
+        return self.__entries.get(key, default)
+
+    def learn(self, key, value, detail=None):
+        '''
+        Record that `value` worked for the shape `key`.
+
+        :param key: A shape.
+        :param value: The value that worked (which must be present).
+        :param detail: Extra data to return with the ordering.
+        '''
+        entries = self.__entries
+        known = entries.get(key)
+        if known is None or known[0][0] != value:
+            with self.__lock:
+                if key not in entries:
+                    while entries and len(entries) >= self.maxsize:
+                        del entries[next(iter(entries))]
+                if self.maxsize > 0:
+                    entries[key] = ((value,) + tuple(other for other in self._data if other != value), detail)
+
+    def __len__(self):
+        return len(self.__entries)
+
+    def clear(self):
+        '''
+        Forget all shapes.
+        '''
+        with self.__lock:
+            self.__entries.clear()
+
+
+class NullLog:
+    '''
+    A logger that discards its arguments.  It is false, so that call sites
+    can avoid building arguments at all:
+
+      if log: log('Found {0}', describe(value))
+    '''
+
+    __slots__ = ()
+
+    def __bool__(self):
+        return False
+
+    def __call__(self, template, *args, **kargs):
+        pass
+
+NULL_LOG = NullLog()
+
+
+class LazyMessage:
+    '''
+    A message that is formatted only when converted to a string (so that the
+    `logging` module can discard it cheaply).
+    '''
+
+    __slots__ = ('template', 'args', 'kargs')
+
+    def __init__(self, template, args, kargs):
+        self.template, self.args, self.kargs = template, args, kargs
+
+    def __str__(self):
+        return self.template.format(*self.args, **self.kargs)
 
 
 class DebugLog:
     '''
-    Base class supporting a simple log to stdout for debugging.  Is it possible
-    to use Python logging and do the same thing?
+    Base class supporting a simple log for debugging.  Messages go to stdout
+    or, if a `logging.Logger` is given as `debug`, to that (at DEBUG level).
+
+    Loggers are false when disabled (see `NullLog`), so code on hot paths
+    should test before logging.
     '''
 
     def _get_log(self, debug):
         '''
-        :param debug: True to enable logging.
-        :return: A logger that will print to stdout if `debug` is `True`
+        :param debug: True to print to stdout, a `logging.Logger`, or false
+                      to disable logging.
+        :return: A logger (false if disabled).
         '''
-        return self._log if debug else self._drop
+        if not debug:
+            return NULL_LOG
+        elif hasattr(debug, 'debug'):  # a logger (logging is not imported here)
+            name = self.__class__.__name__
+            def log(template, *args, **kargs):
+                debug.debug('%s: %s', name, LazyMessage(template, args, kargs))
+            return log
+        else:
+            return self._log
 
     def _log(self, template, *args, **kargs):
         '''
@@ -59,15 +194,57 @@ class DebugLog:
         '''
         print('%s: %s' % (self.__class__.__name__, template.format(*args, **kargs)))
 
-    def _drop(self, template, *args, **kargs):
+
+class PublishedCache:
+    '''
+    A memoizing wrapper for a function whose results are expensive to
+    calculate but rarely change (eg compiled regexps).
+
+    Results are held in a dict that is never modified once published, so
+    hits need no lock.  A miss takes the lock, calculates the value (once,
+    even if several threads miss together) and publishes a new dict.  When
+    full the oldest entry is discarded (hits do not update the order, as
+    that would need the lock).
+    '''
+
+    def __init__(self, function, maxsize, lock):
+        '''
+        :param function: The function to cache (arguments must be hashable).
+        :param maxsize: The maximum number of results to keep.
+        :param lock: The lock used when updating the cache.
+        :return: A callable with the same signature as `function`.
         '''
-        A null logger that discards its arguments.
+        self.__function = function
+        self.maxsize = maxsize
+        self.__lock = lock
+        self.__published = {}
+
+    def __call__(self, *args):
+        try:
+            return self.__published[args]
+        except KeyError:
+            with self.__lock:
+                cache = self.__published
+                if args in cache:  # another thread got here first
+                    return cache[args]
+                value = self.__function(*args)
+                cache = OrderedDict(cache)
+                while cache and len(cache) >= self.maxsize:
+                    cache.popitem(last=False)
+                if self.maxsize > 0:
+                    cache[args] = value
+                self.__published = cache
+                return value
+
+    def __len__(self):
+        return len(self.__published)
 
-        :param template: Unused.
-        :param args: Unused.
-        :param kargs: Unused.
+    def cache_clear(self):
         '''
-        pass
+        Discard all results.
+        '''
+        with self.__lock:
+            self.__published = {}
 
 
 class HashableDict(dict):
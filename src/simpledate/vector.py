@@ -0,0 +1,239 @@
+
+import datetime as dt
+import numpy as np
+from pytz import utc
+from simpledate import SimpleDateParser, SimpleDateError, get_default, tzinfo_localize
+from simpledate.fmt import auto_invert, to_regexp, FIELDS, LOCALE_TIME
+from simpledate.utils import always_tuple
+
+
+# Parse columns of dates that share a single format, using NumPy.  Dates
+# with the same (fixed width) layout as the first are read with array
+# slicing and arithmetic; any others are parsed one at a time.
+
+# (c) 2013 Andrew Cooke (andrew@acooke.org)
+# Released into the public domain for any use, but with absolutely no warranty.
+
+
+EPOCH = dt.datetime(1970, 1, 1)
+ONE_MICROSECOND = dt.timedelta(microseconds=1)
+ONE_SECOND = dt.timedelta(seconds=1)
+US_PER_DAY = 24 * 60 * 60 * 1000000
+
+ZERO, PLUS, MINUS = ord('0'), ord('+'), ord('-')
+
+# the directives we can read from arrays (others, like %j, are read
+# one date at a time).
+NUMBERS = ('Y', 'y', 'y50', 'm', 'd', 'H', 'M', 'S', 'f')
+WORDS = {'b': LOCALE_TIME.a_month, 'B': LOCALE_TIME.f_month,
+         'a': LOCALE_TIME.a_weekday, 'A': LOCALE_TIME.f_weekday}
+SUPPORTED = NUMBERS + tuple(WORDS) + ('z', 'Z')
+
+
+def parse(dates, format,
+          tz=None, is_dst=False, country=None, tz_factory=None,
+          unsafe=False, debug=False):
+    '''
+    Parse an array of dates that share a format.  The results are the same
+    as calling `SimpleDateParser(format).parse()` for each date.
+
+    Timezones are found once for each distinct combination of timezone (name
+    or offset) and day (this assumes that a timezone does not change twice
+    within a day).
+
+    :param dates: A NumPy string array (or a sequence of strings).
+    :param format: The format (see `invert` and `auto_invert`).
+    :param tz: A time zone to use if none available in the date (`None` is
+               local).
+    :param is_dst: Is the date known to be summertime?  (`None` is
+                   'unknown').
+    :param country: A country code (or list of codes) to restrict the
+                    choice of timezone.
+    :param tz_factory: Converts from the timezone text, offset, etc, to a
+                       `dt.tzinfo` instance (`None` is DEFAULT_TZ_FACTORY).
+    :param unsafe: Take the first timezone found.
+    :param debug: If true, print a description of the logic followed.
+    :return: An array of UTC times (`datetime64[us]`) and an array of
+             offsets (seconds, added to UTC to give local time), with the
+             same shape as `dates`.
+    '''
+    formats = always_tuple(format)
+    if len(formats) != 1:
+        raise SimpleDateError('A single format is needed (not {0})', formats)
+    format = auto_invert(formats[0])
+    dates = np.asarray(dates, dtype=str)
+    shape = dates.shape
+    tz_factory = get_default('DEFAULT_TZ_FACTORY', tz_factory)
+    dates = np.ascontiguousarray(dates.reshape(-1))
+
+    def search(zones, datetime):
+        return tz_factory.search(*zones, datetime=datetime, is_dst=is_dst, country=country, unsafe=unsafe, debug=debug)
+
+    def offset(token, local):
+        zones = ()
+        if isinstance(token, str): zones += (token,)
+        elif token: zones += (dt.timedelta(seconds=token),)
+        if tz is not None: zones += (tz,)
+        if not zones: zones += (None,)  # use locale
+        datetime = EPOCH + dt.timedelta(microseconds=int(local))
+        return tzinfo_localize(search(zones, datetime), datetime, is_dst).utcoffset() // ONE_SECOND
+
+    times = np.zeros(len(dates), dtype=np.int64)
+    offsets = np.zeros(len(dates), dtype=np.int32)
+    read = _read(dates, format)
+    ok = np.zeros(len(dates), dtype=bool) if read is None else read[0]
+    if ok.any():
+        _, local, tokens, token_ids = read
+        index = np.flatnonzero(ok)
+        local, token_ids = local[index], token_ids[index]
+        # group by zone and day, and check the offset at either end of each day
+        days = local // US_PER_DAY
+        key = token_ids * (days.max() - days.min() + 1) + days - days.min()
+        order = np.argsort(key, kind='stable')
+        first = np.diff(key[order], prepend=-1) != 0
+        starts = np.flatnonzero(first)
+        group = np.empty(len(key), dtype=np.int64)
+        group[order] = np.cumsum(first) - 1
+        lo = np.minimum.reduceat(local[order], starts)
+        hi = np.maximum.reduceat(local[order], starts)
+        found = np.zeros(len(starts), dtype=np.int32)
+        changed = np.zeros(len(starts), dtype=bool)
+        for i, token_id in enumerate(token_ids[order[starts]]):
+            found[i] = offset(tokens[token_id], lo[i])
+            changed[i] = lo[i] != hi[i] and found[i] != offset(tokens[token_id], hi[i])
+        offsets[index] = found[group]
+        # the rare days when the offset changes are handled date by date
+        for i in np.flatnonzero(changed[group]):
+            offsets[index[i]] = offset(tokens[token_ids[i]], local[i])
+        times[index] = local - offsets[index].astype(np.int64) * 1000000
+
+    # anything with a different layout is parsed one date at a time
+    parser = SimpleDateParser(format)
+    for i in np.flatnonzero(~ok):
+        datetime, _, _ = parser.parse(str(dates[i]), tz=tz, is_dst=is_dst, country=country,
+                                      tz_factory=tz_factory, unsafe=unsafe, debug=debug)
+        offsets[i] = datetime.utcoffset() // ONE_SECOND
+        times[i] = (datetime.astimezone(utc).replace(tzinfo=None) - EPOCH) // ONE_MICROSECOND
+
+    return times.view('datetime64[us]').reshape(shape), offsets.reshape(shape)
+
+
+def _read(dates, format):
+    '''
+    Read the dates that have the same layout as the first that matches
+    the format.
+
+    :param dates: A contiguous, one dimensional, NumPy string array.
+    :param format: The (inverted) format.
+    :return: A mask for the dates that were read, their local times
+             (microseconds from the epoch), the timezone tokens (names,
+             offsets in seconds or `None`) and an index into the tokens
+             for each date.  `None` if no date can be read this way.
+    '''
+    _, _, regexp = to_regexp(format)
+    n, width = len(dates), dates.dtype.itemsize // 4
+    if not n or not width:
+        return None
+    for template in dates:
+        template = str(template)
+        match = regexp.match(template)
+        if match and match.end() == len(template):
+            break
+    else:
+        return None
+    spans = {}
+    for name, index in regexp.groupindex.items():
+        if name in FIELDS and match.start(index) != -1:
+            if name not in SUPPORTED:
+                return None
+            spans[name] = match.span(index)
+
+    # everything outside the directives must match the template exactly
+    # (including the zeroes that pad shorter strings).
+    codes = dates.view(np.uint32).reshape(n, width)
+    literal = np.ones(width, dtype=bool)
+    for start, end in spans.values():
+        literal[start:end] = False
+    expected = np.zeros(width, dtype=np.uint32)
+    expected[:len(template)] = [ord(c) for c in template]
+    ok = (codes[:, literal] == expected[literal]).all(axis=1)
+
+    def number(start, end):
+        nonlocal ok
+        digits = codes[:, start:end].astype(np.int64) - ZERO
+        ok &= ((digits >= 0) & (digits <= 9)).all(axis=1)
+        return digits @ (10 ** np.arange(end - start - 1, -1, -1, dtype=np.int64))
+
+    def words(name):
+        # each distinct word is checked against the regexp, in place
+        nonlocal ok
+        start, end = spans[name]
+        distinct, inverse = np.unique(codes[:, start:end], axis=0, return_inverse=True)
+        values, valid = [], []
+        for word in (''.join(map(chr, row)) for row in distinct):
+            candidate = template[:start] + word + template[end:]
+            match = regexp.match(candidate)
+            valid.append(bool(match) and match.end() == len(candidate) and match.span(name) == (start, end))
+            if name in WORDS:
+                try:
+                    values.append(WORDS[name].index(word.lower()))
+                except ValueError:
+                    values.append(0)
+                    valid[-1] = False
+            else:
+                values.append(word)
+        inverse = inverse.reshape(-1)
+        ok &= np.array(valid)[inverse]
+        return values, inverse
+
+    def value(name, default):
+        if name in spans:
+            return number(*spans[name])
+        else:
+            return np.full(n, default, dtype=np.int64)
+
+    year = value('Y', 1900)
+    if 'y' in spans:
+        year = value('y', 0)
+        year += np.where(year <= 68, 2000, 1900)
+    if 'y50' in spans:
+        year = value('y50', 0)
+        year += np.where(year < 50, 2000, 1900)
+    month = value('m', 1)
+    for name in 'bB':
+        if name in spans:
+            values, inverse = words(name)
+            month = np.array(values, dtype=np.int64)[inverse]
+    day, hour, minute, second = value('d', 1), value('H', 0), value('M', 0), value('S', 0)
+    fraction = value('f', 0)
+    if 'f' in spans:
+        start, end = spans['f']
+        fraction *= 10 ** (6 - (end - start))
+    for name in 'aA':
+        if name in spans:
+            words(name)  # check only
+
+    if 'Z' in spans:
+        tokens, token_ids = words('Z')
+    elif 'z' in spans:
+        start, end = spans['z']
+        sign = codes[:, start]
+        ok &= (sign == PLUS) | (sign == MINUS)
+        if end - start == 6:
+            ok &= codes[:, start + 3] == ord(template[start + 3])
+        minutes = number(end - 2, end)
+        ok &= minutes < 60
+        gmtoff = np.where(sign == MINUS, -60, 60) * (number(start + 1, start + 3) * 60 + minutes)
+        tokens, token_ids = np.unique(np.where(ok, gmtoff, 0), return_inverse=True)
+        # a zero offset is ignored (as in the parser)
+        tokens = [int(token) or None for token in tokens]
+    else:
+        tokens, token_ids = [None], np.zeros(n, dtype=np.int64)
+
+    ok &= (year > 0) & (month > 0) & (month < 13) & (day > 0) & (hour < 24) & (minute < 60) & (second < 60)
+    year, month, day = np.where(ok, year, 1970), np.where(ok, month, 1), np.where(ok, day, 1)
+    months = ((year - 1970) * 12 + month - 1).astype('datetime64[M]')
+    days = months.astype('datetime64[D]') + (day - 1).astype('timedelta64[D]')
+    ok &= days.astype('datetime64[M]') == months  # eg 30th February
+    local = (((days.astype(np.int64) * 24 + hour) * 60 + minute) * 60 + second) * 1000000 + fraction
+    return ok, np.where(ok, local, 0), tokens, np.asarray(token_ids).reshape(-1)
@@ -0,0 +1,48 @@
+
+from unittest import TestCase, skipIf
+from pytz import utc
+from simpledate import SimpleDateParser, SimpleDateError, ISO_8601, RFC_2822
+import datetime as dt
+
+try:
+    import numpy as np
+    from simpledate.vector import parse
+except ImportError:
+    np = None
+
+
+@skipIf(np is None, 'numpy not installed')
+class VectorTest(TestCase):
+
+    def assert_parse(self, dates, format, **kargs):
+        times, offsets = parse(dates, format, **kargs)
+        parser = SimpleDateParser(format)
+        for date, time, offset in zip(dates, times, offsets):
+            target, _, _ = parser.parse(date, **kargs)
+            assert time == np.datetime64(target.astimezone(utc).replace(tzinfo=None), 'us'), (date, time, target)
+            assert offset == target.utcoffset() // dt.timedelta(seconds=1), (date, offset, target)
+
+    def test_offsets(self):
+        self.assert_parse(['2013-06-08T12:34:56.789-04:00', '2013-01-08T00:00:00.000+00:00',
+                           '2012-02-29T23:59:59.999+05:30', '2013-06-08T12:34:56-04:00'], ISO_8601)
+
+    def test_local(self):
+        # the first two days include the switch to and from summer time
+        self.assert_parse(['2013-03-10 01:30:00', '2013-03-10 03:30:00', '2013-11-03 00:30:00',
+                           '2013-11-03 12:00:00', '2013-06-08 12:34:56', '2013-6-8 12:34:56'],
+                          ISO_8601, tz='America/New_York')
+
+    def test_names(self):
+        self.assert_parse(['Sat, 08 Jun 2013 12:34:56 EDT', 'Tue, 08 Jan 2013 12:34:56 EST',
+                           'Sat, 08 Jun 2013 23:34:56 EDT', 'Sat,08 Jun 2013 12:34 EDT'], RFC_2822, tz='America/New_York')
+
+    def test_errors(self):
+        with self.assertRaisesRegex(SimpleDateError, 'Could not parse 2013-02-30'):
+            parse(['2013-02-28', '2013-02-30'], 'Y-m-d')
+        with self.assertRaisesRegex(SimpleDateError, 'single format'):
+            parse(['2013-02-28'], ('Y-m-d', 'd/m/Y'))
+
+    def test_shape(self):
+        times, offsets = parse(np.array([['2013-01-01', '2013-01-02']]), 'Y-m-d', tz='UTC')
+        assert times.shape == offsets.shape == (1, 2), times.shape
+        assert times.dtype == np.dtype('datetime64[us]'), times.dtype